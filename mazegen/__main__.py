@@ -1,22 +1,119 @@
+import itertools
+import os
 import random
-from argparse import ArgumentParser
+import sys
+from argparse import ArgumentParser, HelpFormatter
+from contextlib import nullcontext
 from .grid import *
-from .maze import DepthFirst
-from .solver import Solver
-from .display import *
+from .maze import GENERATORS
+from .solver import SOLVERS
+from .rng import BRAID, GENERATE, SOLVE, derive_seed, make_rng
+from .display import DISPLAYS, DisplayCloseError, available_displays
+
+# Everything that only some modes use (batches, pools, profiling, tiles, traces, images and
+# analysis) is imported where it's used, so that starting up doesn't pay for all of it.
 
 
 DISPLAY_HELP = {
-    "stdout": "will print each step to STDOUT with line breaks.",
+    "stdout": "will draw to STDOUT with ANSI escape codes, redrawing only what changed.",
     "curses": "will use the curses library to print directly to the terminal.",
     "blt": "will attempt to open a bearlibterminal session and use that.",
 }
 
 
+class _HelpFormatter(HelpFormatter):
+    "Lists the displays that are installed, finding them only when help is actually shown."
+
+    def _get_help_string(self, action):
+        text = super()._get_help_string(action)
+        if action.dest == "display":
+            text += " Installed here: " + ", ".join(available_displays()) + "."
+        return text
+
+
+def _move(text: str):
+    "Parses a --seek argument: a move number, or `end`."
+    return None if text == "end" else int(text)
+
+
+def _phase(profile, name: str):
+    "Times a phase of the run if there's a profile, or does nothing."
+    return nullcontext() if profile is None else profile.phase(name)
+
+
+def _maze(args, index: int, seed: int, display=None, profile=None) -> Grid:
+    """
+    Gets the maze with the given index: loaded with --load, or generated from the seed. If a
+    display is given, the maze is carved on it one wall at a time.
+    """
+    if args.load:
+        with _phase(profile, "load"):
+            return Grid.load(args.load)
+    grid = Grid(args.width, args.height)
+    generator = GENERATORS[args.algorithm](grid, make_rng(derive_seed(seed, index), GENERATE))
+    with _phase(profile, "generate"):
+        if display is None:
+            generator.generate()
+        else:
+            from .maze import Carving
+
+            display.loop(Carving(generator))
+        if args.braid:
+            grid.braid(args.braid, make_rng(derive_seed(seed, index), BRAID))
+    if profile is not None:
+        profile.carved(grid)
+    return grid
+
+
+def _mazes(args, seed: int, profile=None):
+    """
+    Yields an (index, grid, analysis) tuple for each maze to solve, in order, out of the --cycles
+    mazes to generate. With --min-difficulty, every maze is analyzed and the ones below it are
+    skipped, the same as in a headless batch; otherwise the analysis is None.
+    """
+    from .analysis import analyze
+
+    indices = itertools.count() if args.cycles < 0 else range(args.cycles)
+    for index in indices:
+        grid = _maze(args, index, seed, profile=profile)
+        analysis = None
+        if args.min_difficulty is not None:
+            analysis = analyze(grid)
+        if analysis is None or analysis["difficulty"] >= args.min_difficulty:
+            yield index, grid, analysis
+
+
+def _replay(args):
+    "Loads the trace given with --replay, seeking to the move given with --seek."
+    from .trace import Trace, TraceReplay
+
+    replay = TraceReplay(Trace.load(args.replay))
+    moves = len(replay.trace)
+    if args.seek is None:
+        replay.skip()
+    elif args.seek < 0:
+        replay.seek(moves + args.seek)
+    else:
+        replay.seek(args.seek)
+    return replay
+
+
 def main():
-    parser = ArgumentParser(description="Generate a maze.")
-    parser.add_argument("width", metavar="W", type=int, help="the width of the maze.")
-    parser.add_argument("height", metavar="H", type=int, help="the height of the maze.")
+    parser = ArgumentParser(description="Generate a maze.", formatter_class=_HelpFormatter)
+    parser.add_argument(
+        "width",
+        metavar="W",
+        type=int,
+        nargs="?",
+        help="the width of the maze. Not needed with --load or --replay.",
+    )
+    parser.add_argument(
+        "height",
+        metavar="H",
+        type=int,
+        nargs="?",
+        help="the height of the maze. Not needed with --load or --replay.",
+    )
     parser.add_argument(
         "--seed", metavar="SEED", type=int, help="the random seed to use."
     )
@@ -25,19 +122,57 @@ def main():
         metavar="STEP",
         type=float,
         default=0.1,
-        help="the time step between each draw.",
+        help="the time step between each step of the solver.",
+    )
+    parser.add_argument(
+        "--fps",
+        metavar="FPS",
+        type=float,
+        default=30,
+        help="the most frames per second to draw, however fast the solver steps. "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--algorithm",
+        metavar="ALGORITHM",
+        type=str,
+        choices=GENERATORS.available(),
+        default="depth-first",
+        help="the maze generation algorithm to use, one of: "
+        + ", ".join(GENERATORS.available())
+        + ". (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--solver",
+        metavar="SOLVER",
+        type=str,
+        choices=list(SOLVERS),
+        default="random",
+        help="the maze solver to use, one of: "
+        + ", ".join(SOLVERS)
+        + ". (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--race",
+        metavar="SOLVER",
+        type=str,
+        nargs="+",
+        choices=list(SOLVERS),
+        help="race several solvers through the same maze at once, each drawn in its own color, "
+        "and print a leaderboard at the end. The same solver may be named more than once. "
+        "Overrides --solver.",
     )
     display_help = (
         "the display strategy to use. "
         + " ".join(["`{}` {}".format(k, v) for k, v in DISPLAY_HELP.items()])
-        + " (default: %(default)s)"
+        + " (default: the most desirable one installed)"
     )
     parser.add_argument(
         "--display",
         metavar="DISPLAY",
         type=str,
-        choices=DISPLAYS_AVAILABLE,  # set in displays/__init__.py
-        default=DISPLAYS_AVAILABLE[-1],  # this uses the most desirable display
+        # Displays are only checked for when one is needed, since that can mean importing them
+        choices=list(DISPLAYS),
         help=display_help,
     )
 
@@ -47,44 +182,371 @@ def main():
         type=int,
         default=-1,
         help="the number of mazes to solve. If less than 0, it will generate and solve infinite "
-             "mazes. (default: %(default)s)"
-    )
-
-    if "blt" in DISPLAYS_AVAILABLE:
-        # add BLT-specific settings, but only when it's enabled
-        parser.add_argument(
-            "--blt-setting",
-            metavar="SETTING",
-            type=str,
-            nargs="*",
-            default=[],
-            help="a list of bearlibterminal settings."
-        )
+             "mazes. With --min-difficulty, this counts every maze generated, including the ones "
+             "skipped. (default: %(default)s)"
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="generate a single maze with Eller's algorithm and write it to STDOUT row by row "
+        "without holding the whole maze in memory. Display options are ignored.",
+    )
+
+    parser.add_argument(
+        "--headless",
+        "--batch",
+        action="store_true",
+        help="generate and solve mazes as fast as possible without a display, writing one JSON "
+        "object per maze and reporting throughput on STDERR at the end.",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        type=str,
+        default="-",
+        help="where headless results are written, or `-` for STDOUT. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        metavar="WORKERS",
+        type=int,
+        default=1,
+        help="the number of processes used to generate and solve headless mazes. 0 uses every "
+        "core. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--min-difficulty",
+        metavar="SCORE",
+        type=float,
+        help="only keep mazes whose difficulty score, from 0 to 1, is at least this much. Kept "
+        "headless mazes include their analysis: dead ends, junctions, straightness, solution "
+        "length and diameter. Skipped mazes still count towards --cycles.",
+    )
+    parser.add_argument(
+        "--braid",
+        metavar="P",
+        type=float,
+        help="remove each dead end of every generated maze with this probability, from 0 to 1, "
+        "by opening it into a neighbor. This gives the maze loops, so there's more than one way "
+        "through.",
+    )
+    parser.add_argument(
+        "--pool",
+        metavar="MAZES",
+        type=int,
+        default=2,
+        help="the most mazes to generate ahead of time in the background while one is being "
+        "solved, so the next one is ready straight away. 0 generates each maze only when it's "
+        "needed. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pool-memory",
+        metavar="MB",
+        type=int,
+        default=512,
+        help="the most memory, in megabytes, that mazes generated ahead of time may take up. At "
+        "least one is always generated ahead, however big. (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "--export",
+        metavar="FILE",
+        type=str,
+        help="generate a single maze and save it as an image instead of displaying it. The format "
+        "is picked from the extension: .png, .pgm or .pbm.",
+    )
+    parser.add_argument(
+        "--cell-size",
+        metavar="PIXELS",
+        type=int,
+        default=4,
+        help="the size of each cell in exported images. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--wall-size",
+        metavar="PIXELS",
+        type=int,
+        default=1,
+        help="the thickness of walls in exported images. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--overlay",
+        action="store_true",
+        help="solve the exported maze and draw the solver's path over it.",
+    )
+
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        type=str,
+        nargs="?",
+        const="-",
+        help="time each phase of the run and count what happened in it (walls carved, steps, "
+        "backtracks, branches, frames drawn and their cost), printing a summary to STDERR at the "
+        "end. Given a file, the run is also profiled with cProfile and the stats are saved there "
+        "for `pstats`. cProfile only sees one thread, so mazes aren't generated ahead of time "
+        "then, whatever --pool says.",
+    )
+    parser.add_argument(
+        "--animate",
+        action="store_true",
+        help="show each maze being carved, one wall every step, before solving it.",
+    )
+
+    parser.add_argument(
+        "--load",
+        metavar="FILE",
+        type=str,
+        help="use a maze saved with `Grid.save` instead of generating one.",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="FILE",
+        type=str,
+        help="solve a single maze without a display and save a trace of every move the solver "
+        "made, along with the maze, to be replayed later with --replay. Only the `random` solver "
+        "moves one cell at a time, which a trace needs.",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="FILE",
+        type=str,
+        help="replay a trace saved with --record on the display once instead of solving a maze, "
+        "at the speed set by --step. --cycles is ignored.",
+    )
+    parser.add_argument(
+        "--seek",
+        metavar="MOVE",
+        type=_move,
+        default=0,
+        help="the move to start replaying from, negative to count back from the end, or `end` to "
+        "skip straight to the end. (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "--tiled",
+        action="store_true",
+        help="generate the maze in tiles on demand, keeping only recently visited tiles in memory, "
+        "and show it through a window that follows the solver. This allows mazes far bigger than "
+        "memory, like 1000000 by 1000000. Only the `random` solver works with tiled mazes.",
+    )
+    parser.add_argument(
+        "--tile-size",
+        metavar="CELLS",
+        type=int,
+        default=64,
+        help="the width and height of each tile of a tiled maze. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--tile-cache",
+        metavar="TILES",
+        type=int,
+        default=64,
+        help="the most tiles of a tiled maze to keep in memory. (default: %(default)s)",
+    )
+
+    parser.add_argument(
+        "--blt-setting",
+        metavar="SETTING",
+        type=str,
+        nargs="*",
+        default=[],
+        help="a list of bearlibterminal settings, for the `blt` display."
+    )
 
     args = parser.parse_args()
-    if args.seed:
-        random.seed(args.seed)
-
-    if args.display == "stdout":
-        display = StdoutDisplay(sleep=args.step)
-    elif args.display == "blt":
-        display = BearLibTermDisplay(settings=args.blt_setting, sleep=args.step)
-    elif args.display == "curses":
-        display = CursesDisplay(sleep=args.step)
-    else:
-        assert False, "No display"
+    if args.height is None and (args.stream or args.headless or not (args.load or args.replay)):
+        parser.error("the maze width and height are required unless using --load or --replay")
+    if args.tiled and (args.race or args.solver != "random"):
+        parser.error("only the `random` solver works with --tiled")
+    if args.animate and (args.tiled or args.load or args.replay):
+        parser.error("--animate can't be used with --tiled, --load or --replay")
+    if args.braid and (args.tiled or args.stream):
+        parser.error("--braid can't be used with --tiled or --stream")
+    if args.min_difficulty is not None and (args.animate or args.tiled or args.load):
+        parser.error("--min-difficulty can't be used with --animate, --tiled or --load")
+    if args.min_difficulty is not None and not 0 <= args.min_difficulty <= 1:
+        parser.error("--min-difficulty must be between 0 and 1")
+
+    profile = None
+    if args.profile is not None:
+        from .profiling import Profile
+
+        profile = Profile(cprofile=args.profile != "-")
+        profile.start()
+    try:
+        _run(parser, args, profile)
+    finally:
+        if profile is not None:
+            profile.stop()
+            sys.stderr.write(profile.summary() + "\n")
+            if args.profile != "-":
+                profile.dump(args.profile)
+                sys.stderr.write("cProfile stats saved to {}\n".format(args.profile))
+
+
+def _run(parser, args, profile):
+    "Does whatever the parsed arguments ask for."
+    # Every maze gets its own seed derived from this one, so that one maze doesn't depend on how
+    # many random numbers the ones before it used.
+    seed = args.seed if args.seed is not None else random.getrandbits(64)
+
+    if args.stream:
+        from .stream import stream_maze
+
+        rng = make_rng(derive_seed(seed, 0), GENERATE)
+        try:
+            stream_maze(args.width, args.height, sys.stdout, rng)
+        except BrokenPipeError:
+            # The reader went away (e.g. piped into `head`), which is fine. Point STDOUT at devnull
+            # so that the final flush at exit doesn't complain about it too.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return
+
+    if args.export:
+        from .render import WRITERS, export
+
+        if os.path.splitext(args.export)[1].lower() not in WRITERS:
+            parser.error("--export must end in one of: " + ", ".join(WRITERS))
+        grid = _maze(args, 0, seed, profile=profile)
+        path = None
+        if args.overlay:
+            with _phase(profile, "solve"):
+                path = SOLVERS[args.solver](grid, make_rng(derive_seed(seed, 0), SOLVE)).solve()
+        with _phase(profile, "export"):
+            export(grid, args.export, args.cell_size, args.wall_size, path)
+        return
+
+    if args.record:
+        from .trace import record
+
+        grid = _maze(args, 0, seed, profile=profile)
+        solver = SOLVERS[args.solver](grid, make_rng(derive_seed(seed, 0), SOLVE))
+        try:
+            with _phase(profile, "solve"):
+                trace = record(solver)
+        except ValueError as e:
+            parser.error(str(e))
+        if profile is not None:
+            from .profiling import solver_counters
+
+            profile.update("solve", solver_counters(solver))
+        with _phase(profile, "save"):
+            trace.save(args.record)
+        sys.stderr.write("{} moves recorded to {}\n".format(len(trace), args.record))
+        return
+
+    if args.headless:
+        from .batch import run_batch
+
+        batch_args = (args.width, args.height, args.cycles, args.algorithm)
+        batch_kwargs = dict(
+            seed=seed,
+            workers=args.workers,
+            solver=args.solver,
+            min_difficulty=args.min_difficulty,
+            braid=args.braid,
+            profile=profile,
+        )
+        if args.output == "-":
+            run_batch(*batch_args, out=sys.stdout, **batch_kwargs)
+        else:
+            with open(args.output, "w") as out:
+                run_batch(*batch_args, out=out, **batch_kwargs)
+        return
+
+    # Use the most desirable display unless one was picked
+    available = available_displays()
+    name = args.display or available[-1]
+    if name not in available:
+        parser.error("the `{}` display isn't installed".format(name))
+    options = dict(sleep=args.step, fps=args.fps)
+    if name == "blt":
+        options["settings"] = args.blt_setting
+    display = DISPLAYS[name](**options)
+    display.profile = profile
+
+    # Mazes come from a pool that generates them ahead of time, unless they're carved on the
+    # display or there's nothing to generate.
+    mazes = pool = None
+    if not (args.animate or args.tiled or args.replay):
+        mazes = _mazes(args, seed, profile)
+        # cProfile only sees the thread that started it, so generating in the background would
+        # leave generation out of the stats
+        if args.pool > 0 and args.profile in (None, "-"):
+            from .pool import MazePool
+
+            pool = MazePool(mazes, args.pool, args.pool_memory << 20)
+            mazes = iter(pool)
 
     count = 0
-    cycles = args.cycles
+    # A trace is the same every time through, so it's only replayed once
+    cycles = 1 if args.replay else args.cycles
+    leaderboards = []
     while count != cycles:
-        count += 1
-        grid = Grid(args.width, args.height)
-        DepthFirst(grid).generate()
-        solver = Solver(grid)
+        index, grid = count, None
+        view = None
+        solver = None
         try:
-            display.loop(solver)
+            if mazes is not None:
+                with _phase(profile, "wait"):
+                    item = next(mazes, None)
+                if item is None:
+                    # The rest of the mazes were all skipped
+                    break
+                index, grid, _ = item
+            elif args.animate:
+                grid = _maze(args, index, seed, display, profile)
+            # The same seed as the maze with this index in a headless batch
+            maze_seed = derive_seed(seed, index)
+            if args.tiled:
+                import shutil
+                from .tiled import TiledGrid, TiledSolver, Viewport
+
+                grid = TiledGrid(
+                    args.width,
+                    args.height,
+                    maze_seed,
+                    args.algorithm,
+                    tile_size=args.tile_size,
+                    cache_size=args.tile_cache,
+                )
+                solver = TiledSolver(grid, make_rng(maze_seed, SOLVE))
+                # Fill the terminal, leaving a line for the cursor
+                columns, lines = shutil.get_terminal_size()
+                view = Viewport(grid, (columns - 1) // 4, (lines - 2) // 2)
+            elif args.replay:
+                solver = _replay(args)
+            elif args.race:
+                from .race import Race
+
+                solvers = [
+                    SOLVERS[name](grid, make_rng(maze_seed, SOLVE, i))
+                    for i, name in enumerate(args.race)
+                ]
+                solver = Race(solvers, names=args.race)
+            else:
+                solver = SOLVERS[args.solver](grid, make_rng(maze_seed, SOLVE))
+            with _phase(profile, "solve"):
+                race = display.loop(solver, view)
+            if profile is not None:
+                from .profiling import solver_counters
+
+                profile.update("solve", solver_counters(race))
         except DisplayCloseError:
             break
+        finally:
+            if args.race and solver is not None:
+                leaderboards.append(solver.format_leaderboard())
+        count += 1
+
+    if pool is not None:
+        pool.close()
+    # Restore the terminal before printing anything
+    del display
+    for i, leaderboard in enumerate(leaderboards):
+        print("Maze {}:\n{}".format(i + 1, leaderboard))
 
 
 if __name__ == "__main__":
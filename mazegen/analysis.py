@@ -0,0 +1,118 @@
+"""
+Maze analysis. Everything here works off a grid's adjacency index in time linear in the number of
+cells: the degree counts are a single bytes.translate, and the path lengths take two breadth-first
+passes over the maze.
+
+Lengths are counted in moves between cells, from the entrance at (0, 0) to the goal in the
+bottom-right corner, the same one `MazeSolver.goal` uses.
+"""
+from array import array
+from .grid import *
+from .grid import DEGREE
+
+__all__ = ("analyze", "difficulty", "distances")
+
+NORTH, EAST, SOUTH, WEST = (w.value for w in Wall)
+
+
+def distances(adjacency: Adjacency, start: int):
+    """
+    Gets the distance in moves from a cell to every other cell, as an array with -1 for cells
+    that can't be reached, along with the index of a cell that's as far away as any.
+    """
+    passages, moves = adjacency.open, adjacency.moves
+    dist = array("l", [-1]) * len(passages)
+    dist[start] = 0
+    frontier = [start]
+    depth = 0
+    while True:
+        depth += 1
+        following = []
+        append = following.append
+        for index in frontier:
+            for delta in moves[passages[index]]:
+                other = index + delta
+                if dist[other] < 0:
+                    dist[other] = depth
+                    append(other)
+        if not following:
+            return dist, frontier[-1]
+        frontier = following
+
+
+def _decisions(adjacency: Adjacency, dist, goal: int) -> int:
+    """
+    Counts the cells on the shortest path to the goal, not counting the goal itself, where a solver
+    had more than one way to go.
+    """
+    passages, moves = adjacency.open, adjacency.moves
+    decisions = 0
+    index = goal
+    while dist[index] > 0:
+        depth = dist[index] - 1
+        for delta in moves[passages[index]]:
+            if dist[index + delta] == depth:
+                index += delta
+                break
+        # Every open direction here is a choice, except the one the solver arrived from
+        if len(moves[passages[index]]) > (1 if depth == 0 else 2):
+            decisions += 1
+    return decisions
+
+
+def difficulty(solution: int, diameter: int, decisions: int, straightness: float) -> float:
+    """
+    Scores how hard a maze is to solve, from 0 to 1, as the mean of three ratios: how close the
+    solution comes to the longest path in the maze, how often the solution passes a junction, and
+    how much the maze's corridors twist and turn.
+    """
+    if solution <= 0:
+        return 0.0
+    return (solution / diameter + decisions / solution + 1.0 - straightness) / 3
+
+
+def analyze(grid: Grid):
+    """
+    Analyzes a grid, returning a dict with:
+
+    * `cells`: the number of cells
+    * `degrees`: how many cells have 0, 1, 2, 3 and 4 open directions
+    * `dead_ends`: the number of cells with only one way out
+    * `junctions`: the number of cells with three or more ways out
+    * `straightness`: the share of corridor cells that go straight through instead of turning
+    * `unreachable`: the number of cells that can't be reached from the entrance
+    * `solution`: the length of the shortest path from the entrance to the goal, or -1 if there is
+      none
+    * `decisions`: the number of cells along that path where there was more than one way to go
+    * `diameter`: the length of the longest shortest path between any two cells, found with a
+      second breadth-first pass from the cell farthest from the entrance. It's exact for perfect
+      mazes and a lower bound for anything with loops
+    * `difficulty`: the score from `difficulty()`
+    """
+    adjacency = grid.adjacency()
+    passages = adjacency.open
+    degrees = passages.translate(DEGREE)
+    counts = [degrees.count(degree) for degree in range(5)]
+    corridors = counts[2]
+    straight = passages.count(NORTH | SOUTH) + passages.count(EAST | WEST)
+    straightness = straight / corridors if corridors else 0.0
+
+    goal = len(passages) - 1
+    dist, farthest = distances(adjacency, 0)
+    solution = dist[goal]
+    decisions = _decisions(adjacency, dist, goal) if solution >= 0 else 0
+    unreachable = dist.count(-1)
+    dist, end = distances(adjacency, farthest)
+    diameter = dist[end]
+    return {
+        "cells": len(passages),
+        "degrees": counts,
+        "dead_ends": counts[1],
+        "junctions": counts[3] + counts[4],
+        "straightness": straightness,
+        "unreachable": unreachable,
+        "solution": solution,
+        "decisions": decisions,
+        "diameter": diameter,
+        "difficulty": difficulty(solution, diameter, decisions, straightness),
+    }
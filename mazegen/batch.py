@@ -0,0 +1,224 @@
+"""
+Headless batch mode. Mazes are generated and solved as fast as possible, with one JSON object per
+maze written out in order as they finish.
+
+Every maze gets its own seed derived from the batch seed and its index, and its generator and
+solver draw from separate streams derived from that, so the output is the same no matter how many
+worker processes are used.
+
+Given a minimum difficulty, each maze is analyzed before it's solved and only mazes at least that
+difficult are kept, so a batch can generate many candidates and write out the hard ones.
+"""
+import base64
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from array import array
+from collections import deque
+from .analysis import analyze
+from .grid import *
+from .maze import GENERATORS
+from .rng import BRAID, GENERATE, SOLVE, derive_seed, make_rng
+from .solver import SOLVERS
+
+__all__ = ("run_batch", "solve_one")
+
+
+def solve_one(task):
+    """
+    Generates and solves a single maze. `task` is an (index, seed, width, height, algorithm,
+    solver, minimum difficulty, braid probability) tuple, and the result is kept compact so that
+    it's cheap to send between processes: (index, seed, packed walls, path as flat cell indices,
+    steps, generate time, solve time, analysis).
+
+    The analysis is None unless there's a minimum difficulty. Mazes below it aren't solved, and
+    come back with None for their walls and path.
+    """
+    index, seed, width, height, algorithm, solver_name, min_difficulty, braid = task
+    start = time.perf_counter()
+    grid = Grid(width, height)
+    GENERATORS[algorithm](grid, make_rng(seed, GENERATE)).generate()
+    if braid:
+        grid.braid(braid, make_rng(seed, BRAID))
+    analysis = None
+    if min_difficulty is not None:
+        analysis = analyze(grid)
+        if analysis["difficulty"] < min_difficulty:
+            return (index, seed, None, None, 0, time.perf_counter() - start, 0.0, analysis)
+    generated = time.perf_counter()
+    solver = SOLVERS[solver_name](grid, make_rng(seed, SOLVE))
+    steps = solver.run_to_completion()
+    solved = time.perf_counter()
+    path = array("L", (y * width + x for x, y in solver.path))
+    return (
+        index,
+        seed,
+        bytes(grid.walls),
+        path.tobytes(),
+        steps,
+        generated - start,
+        solved - generated,
+        analysis,
+    )
+
+
+def _record(result, width: int, height: int, algorithm: str, solver: str):
+    "Expands a compact result from `solve_one` into a JSON-friendly dict."
+    index, seed, walls, path, steps, generate_seconds, solve_seconds, analysis = result
+    cells = array("L")
+    cells.frombytes(path)
+    record = {
+        "index": index,
+        "seed": seed,
+        "width": width,
+        "height": height,
+        "algorithm": algorithm,
+        "solver": solver,
+        "walls": base64.b64encode(walls).decode("ascii"),
+        "path": [(i % width, i // width) for i in cells],
+        "steps": steps,
+        "generate_seconds": generate_seconds,
+        "solve_seconds": solve_seconds,
+    }
+    if analysis is not None:
+        record["analysis"] = analysis
+    return record
+
+
+def _profile(profile, result):
+    "Adds the timings and counts of a result from `solve_one` to a profile."
+    _, _, walls, _, steps, generate_seconds, solve_seconds, _ = result
+    profile.add_time("generate", generate_seconds)
+    profile.add("generate.mazes")
+    if walls is None:
+        profile.add("generate.rejected")
+        return
+    profile.add_time("solve", solve_seconds)
+    profile.add("solve.steps", steps)
+
+
+def _solve_chunk(tasks):
+    "Solves a few tasks in one go, so that each trip to a worker process carries more work."
+    return [solve_one(task) for task in tasks]
+
+
+def _results(tasks, workers: int):
+    "Runs tasks, in order, either in this process or across a pool of worker processes."
+    if workers == 1:
+        yield from map(solve_one, tasks)
+        return
+    # Tasks are handed out a few at a time, with a bounded number of chunks in flight so that an
+    # infinite batch doesn't queue up forever. Another chunk goes out as soon as the oldest one
+    # is done, which keeps every worker busy instead of waiting on the slowest of a window.
+    chunk_size = 4
+    in_flight = workers * 4
+    tasks = iter(tasks)
+    pending = deque()
+    with multiprocessing.Pool(workers) as pool:
+
+        def submit():
+            chunk = list(itertools.islice(tasks, chunk_size))
+            if chunk:
+                pending.append(pool.apply_async(_solve_chunk, (chunk,)))
+
+        for _ in range(in_flight):
+            submit()
+        while pending:
+            results = pending.popleft().get()
+            submit()
+            yield from results
+
+
+def run_batch(
+    width: int,
+    height: int,
+    cycles: int,
+    algorithm: str,
+    out=None,
+    report=None,
+    seed=None,
+    workers: int = 1,
+    solver: str = "random",
+    min_difficulty: float = None,
+    braid: float = None,
+    profile=None,
+):
+    """
+    Generates and solves `cycles` mazes (or forever, if negative), writing each result to `out` as
+    a line of JSON and a throughput summary to `report` at the end. `workers` is the number of
+    processes to use; 0 or less uses every core.
+
+    Walls are the base64 of `Grid.walls`, and can be loaded back with `Grid.from_walls`.
+
+    With a `min_difficulty`, every maze is analyzed (see `mazegen.analysis`) and only the ones
+    scoring at least that much are written out, with their analysis included. `cycles` still counts
+    every maze generated.
+
+    With `braid`, every maze is braided with that probability (see `Grid.braid`) before it's
+    analyzed or solved.
+
+    Given a `mazegen.profiling.Profile`, the time each maze spent being generated and solved is
+    added to it, even when that happened in another process.
+    """
+    out = out or sys.stdout
+    report = report or sys.stderr
+    if seed is None:
+        seed = random.getrandbits(64)
+    if workers <= 0:
+        workers = multiprocessing.cpu_count()
+
+    def tasks():
+        index = 0
+        while index != cycles:
+            yield (
+                index,
+                derive_seed(seed, index),
+                width,
+                height,
+                algorithm,
+                solver,
+                min_difficulty,
+                braid,
+            )
+            index += 1
+
+    count = 0
+    rejected = 0
+    steps = 0
+    start = time.perf_counter()
+    try:
+        for result in _results(tasks(), workers):
+            if profile is not None:
+                _profile(profile, result)
+            if result[2] is None:
+                rejected += 1
+                continue
+            record = _record(result, width, height, algorithm, solver)
+            out.write(json.dumps(record))
+            out.write("\n")
+            count += 1
+            steps += record["steps"]
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into `head`), which is fine. Point the output at devnull
+        # so that the final flush at exit doesn't complain about it too.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+    finally:
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        report.write(
+            "{} mazes, {} steps in {:.3f}s ({:.2f} mazes/sec, {:.0f} steps/sec)\n".format(
+                count, steps, elapsed, count / elapsed, steps / elapsed
+            )
+        )
+        if min_difficulty is not None:
+            report.write(
+                "{} of {} mazes were below difficulty {}\n".format(
+                    rejected, count + rejected, min_difficulty
+                )
+            )
+    return count, steps, elapsed
@@ -0,0 +1,275 @@
+"""
+Benchmarks for maze generation, solving and rendering across grid sizes.
+
+Run with `python -m mazegen.bench`. Results are written as JSON so that runs can be compared; pass
+an earlier result with `--compare` to print the change in throughput for each measurement.
+
+`--startup` also times how long the command line takes to start up and exit, in fresh processes.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from .grid import *
+from .maze import GENERATORS
+from .rng import BRAID, GENERATE, SOLVE, make_rng
+from .solver import SOLVERS
+
+__all__ = ("bench_size", "bench_startup", "main")
+
+DEFAULT_SIZES = (10, 100, 500, 1000, 2000)
+# Command lines to time starting up: a tiny headless run, which never needs a display, and --help
+STARTUP_COMMANDS = {
+    "headless": ("2", "2", "--headless", "--cycles", "1", "--output", os.devnull),
+    "help": ("--help",),
+}
+
+
+def _measure(func, trace_memory: bool):
+    """
+    Runs `func` and returns (result, seconds, peak bytes, net allocated blocks). When memory is
+    traced, `func` runs a second time under tracemalloc so that tracing doesn't skew the timing.
+    """
+    blocks = sys.getallocatedblocks()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    blocks = sys.getallocatedblocks() - blocks
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak, blocks
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else None
+
+
+def bench_size(
+    width: int,
+    height: int,
+    seed: int,
+    algorithm: str,
+    solver: str,
+    trace_memory=True,
+    braid: float = None,
+):
+    """
+    Benchmarks generating, solving and rendering one maze of the given size. With `braid`, the maze
+    is braided with that probability (see `Grid.braid`) as part of generating it, so that the
+    solver has loops to deal with.
+    """
+    cells = width * height
+
+    def generate():
+        grid = Grid(width, height)
+        GENERATORS[algorithm](grid, make_rng(seed, GENERATE)).generate()
+        if braid:
+            grid.braid(braid, make_rng(seed, BRAID))
+        return grid
+
+    grid, seconds, peak, _ = _measure(generate, trace_memory)
+    results = {
+        "width": width,
+        "height": height,
+        "generate": {
+            "seconds": seconds,
+            "cells_per_sec": _rate(cells, seconds),
+            "peak_bytes": peak,
+        },
+    }
+
+    def solve():
+        copy = Grid.from_walls(width, height, grid.walls)
+        return SOLVERS[solver](copy, make_rng(seed, SOLVE)).run_to_completion()
+
+    steps, seconds, peak, blocks = _measure(solve, trace_memory)
+    results["solve"] = {
+        "steps": steps,
+        "seconds": seconds,
+        "steps_per_sec": _rate(steps, seconds),
+        "peak_bytes": peak,
+        # Memory blocks still allocated at the end, per step. Python doesn't count allocations
+        # directly, so this is the net growth rather than the churn.
+        "blocks_per_step": blocks / steps if steps else 0.0,
+    }
+
+    _, seconds, peak, _ = _measure(grid.render, trace_memory)
+    results["render"] = {
+        "seconds": seconds,
+        "cells_per_sec": _rate(cells, seconds),
+        "peak_bytes": peak,
+    }
+    return results
+
+
+def bench_startup(runs: int):
+    """
+    Times each of `STARTUP_COMMANDS` from a cold start, `runs` times each in a new interpreter,
+    returning the fastest and median seconds. The first run of each is thrown away, so that
+    compiling bytecode isn't counted.
+    """
+    results = {}
+    for name, command in STARTUP_COMMANDS.items():
+        command = [sys.executable, "-m", "mazegen", *command]
+        times = []
+        for _ in range(runs + 1):
+            start = time.perf_counter()
+            subprocess.run(
+                command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            times.append(time.perf_counter() - start)
+        times = times[1:]
+        results[name] = {"min_seconds": min(times), "median_seconds": statistics.median(times)}
+    return results
+
+
+def _report_startup(result, baseline=None, out=sys.stderr):
+    "Writes a line per startup command, with the change against a baseline if given."
+    out.write("startup\n")
+    for name, metrics in result.items():
+        line = "  {:<10} {:>10.1f} ms median, {:.1f} ms best".format(
+            name, metrics["median_seconds"] * 1000, metrics["min_seconds"] * 1000
+        )
+        if baseline and name in baseline:
+            line += "  ({:+.1%})".format(
+                metrics["median_seconds"] / baseline[name]["median_seconds"] - 1
+            )
+        out.write(line + "\n")
+
+
+def _rates(result):
+    "Pulls the throughput numbers out of one size's results, keyed by (phase, metric)."
+    return {
+        (phase, key): value
+        for phase, metrics in result.items()
+        if isinstance(metrics, dict)
+        for key, value in metrics.items()
+        if key.endswith("_per_sec") and value
+    }
+
+
+def _report(result, baseline=None, out=sys.stderr):
+    "Writes a human-readable line per phase, with the change against a baseline if given."
+    out.write("{}x{}\n".format(result["width"], result["height"]))
+    old = _rates(baseline) if baseline else {}
+    for (phase, key), value in _rates(result).items():
+        line = "  {:<10} {:>14,.0f} {}".format(phase, value, key.replace("_", " "))
+        if (phase, key) in old:
+            line += "  ({:+.1%})".format(value / old[(phase, key)] - 1)
+        peak = result[phase].get("peak_bytes")
+        if peak is not None:
+            line += "  peak {:,} bytes".format(peak)
+        out.write(line + "\n")
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark maze generation, solving and rendering.")
+    parser.add_argument(
+        "--sizes",
+        metavar="N",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_SIZES),
+        help="the sizes of the square grids to benchmark. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--seed", metavar="SEED", type=int, default=1, help="the random seed to use."
+    )
+    parser.add_argument(
+        "--algorithm",
+        metavar="ALGORITHM",
+        choices=GENERATORS.available(),
+        default="depth-first",
+        help="the maze generation algorithm to benchmark. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--solver",
+        metavar="SOLVER",
+        choices=list(SOLVERS),
+        default="random",
+        help="the maze solver to benchmark. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--braid",
+        metavar="P",
+        type=float,
+        help="braid every maze, removing each dead end with this probability, to benchmark "
+        "solving mazes with loops.",
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="skip the (slow) tracemalloc runs that measure peak memory.",
+    )
+    parser.add_argument(
+        "--startup",
+        metavar="RUNS",
+        type=int,
+        default=0,
+        help="also time starting the command line up this many times. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        type=str,
+        default="-",
+        help="where to write the JSON results, or `-` for STDOUT. (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--compare",
+        metavar="FILE",
+        type=str,
+        help="an earlier JSON result to compare throughput against.",
+    )
+    args = parser.parse_args()
+
+    baselines = {}
+    startup_baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        for result in previous["results"]:
+            baselines[(result["width"], result["height"])] = result
+        startup_baseline = previous.get("startup")
+
+    results = []
+    for size in args.sizes:
+        result = bench_size(
+            size, size, args.seed, args.algorithm, args.solver, not args.no_memory, args.braid
+        )
+        _report(result, baselines.get((size, size)))
+        results.append(result)
+
+    document = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "algorithm": args.algorithm,
+        "solver": args.solver,
+        "braid": args.braid,
+        "results": results,
+    }
+    if args.startup > 0:
+        document["startup"] = bench_startup(args.startup)
+        _report_startup(document["startup"], startup_baseline)
+    if args.output == "-":
+        json.dump(document, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,53 @@
-import abc
-import time
-from mazegen.grid import Grid
-from mazegen.solver import Solver
-from .base import *
+"""
+Displays, which draw solvers working through a maze.
+
+Display backends are looked up by name in `DISPLAYS`, and each one is only imported when it's
+used. Importing this package doesn't import curses, bearlibterminal or even asyncio, so runs that
+never display anything don't pay for them. The display classes can still be imported from here by
+name, which imports just that backend.
+"""
+import importlib
+from mazegen.registry import LazyRegistry
 from .exception import *
 
-ALL = [
+__all__ = [
+    'DISPLAYS',
     'DISPLAYS_AVAILABLE',
-    'StdoutDisplay',
     'Display',
     'DisplayCloseError',
+    'StdoutDisplay',
+    'available_displays',
 ]
 
-DISPLAYS_AVAILABLE = ['stdout']
-try:
-    from .curses import *
-    DISPLAYS_AVAILABLE += ['curses']
-    ALL += ['CursesDisplay']
-except ImportError:
-    pass
-try:
-    from .bearlib import *
-    DISPLAYS_AVAILABLE += ['blt']
-    ALL += ['BearLibTermDisplay']
-except ImportError:
-    pass
-
-__all__ = ALL
-
-
-class StdoutDisplay(Display):
-    def draw(self, solver: Solver):
-        canvas = solver.grid.draw()
-        x, y = solver.pos
-        tx = x * 4 + 2
-        ty = y * 2 + 1
-        canvas[ty][tx] = "\u001b[36m" + self.guy + "\u001b[0m"
-        # TODO more involved terminal commands that allow the maze to be drawn in the terminal
-        # without newlines
-        for row in canvas:
-            print("".join(row))
+# Every display backend, in order from least to most desirable
+DISPLAYS = LazyRegistry(__name__)
+DISPLAYS.register('stdout', '.stdout', 'StdoutDisplay')
+DISPLAYS.register('curses', '.curses', 'CursesDisplay', requires='_curses')
+DISPLAYS.register('blt', '.bearlib', 'BearLibTermDisplay', requires='bearlibterminal')
+
+# Names that are imported from their own modules the first time they're asked for
+_LAZY = {
+    'Display': ('.base', 'Display'),
+    'StdoutDisplay': ('.stdout', 'StdoutDisplay'),
+    'CursesDisplay': ('.curses', 'CursesDisplay'),
+    'BearLibTermDisplay': ('.bearlib', 'BearLibTermDisplay'),
+}
+
+
+def available_displays():
+    """
+    Lists the names of the displays whose libraries are installed. Libraries are found, not
+    imported, and only the first time this is called.
+    """
+    return DISPLAYS.available()
+
 
+def __getattr__(name):
+    if name == 'DISPLAYS_AVAILABLE':
+        return available_displays()
+    if name in _LAZY:
+        module, attribute = _LAZY[name]
+        value = getattr(importlib.import_module(module, __name__), attribute)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -1,35 +1,154 @@
 import abc
+import asyncio
 import time
 from mazegen.grid import Grid
-from mazegen.solver import Solver
+from mazegen.race import Race
 from mazegen.display.exception import DisplayCloseError
 
+# The most steps taken in one go before letting the drawing and input tasks run
+MAX_STEPS_PER_TICK = 10000
+# How often input is checked, in seconds
+POLL_INTERVAL = 1 / 60
+
 
 class Display(metaclass=abc.ABCMeta):
-    def __init__(self, sleep=None, guy=None):
+    def __init__(self, sleep=None, guy=None, fps=None):
         self.sleep = sleep or 0.1
+        self.fps = fps or 30
         guy = guy or "▪"
         self.guy = guy[0]
+        self.last_positions = set()
+        self.view = None
+        # A `mazegen.profiling.Profile` to time frames and count what they draw into, if any
+        self.profile = None
+
+    def loop(self, solver, view=None):
+        """
+        Runs a solver, or a race of several solvers, until it's done. Solvers take a step every
+        `sleep` seconds, as many at a time as they need to keep up, while the display draws the
+        latest state at up to `fps` frames per second and checks for input on its own.
 
-    def loop(self, solver):
-        "A basic blocking update loop"
-        grid = solver.grid
-        while not solver.is_done:
-            self.draw(solver)
-            self.update(solver)
-            self.delay()
-        self.draw(solver)
-
-    def delay(self, duration=None):
-        duration = duration or self.sleep
+        Grids are drawn whole, unless a view like `mazegen.tiled.Viewport` is given to draw
+        instead. The view follows the first solver around. Returns the race that was run.
+        """
+        race = solver if isinstance(solver, Race) else Race([solver])
+        self.view = view
+        self.surface(race).take_changes()
+        self.last_positions = set()
+        self.begin(race)
         try:
-            time.sleep(duration)
+            asyncio.run(self._run(race))
         except KeyboardInterrupt:
             raise DisplayCloseError()
+        self.end(race)
+        return race
+
+    def _draw(self, race: Race):
+        "Draws a frame, timing it if there's a profile."
+        if self.profile is None:
+            self.draw(race)
+            return
+        start = time.perf_counter()
+        self.draw(race)
+        self.profile.frame(time.perf_counter() - start)
+
+    async def _run(self, race: Race):
+        self._draw(race)
+        done = asyncio.Event()
+        tasks = [
+            asyncio.ensure_future(self._simulate(race, done)),
+            asyncio.ensure_future(self._render(race, done)),
+            asyncio.ensure_future(self._poll(done)),
+        ]
+        try:
+            finished, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in finished:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+        self._draw(race)
+
+    async def _simulate(self, race: Race, done):
+        "Steps the solvers at their own rate, independent of drawing."
+        start = time.perf_counter()
+        taken = 0
+        while not race.is_done:
+            due = int((time.perf_counter() - start) / self.sleep) + 1
+            for _ in range(min(due - taken, MAX_STEPS_PER_TICK)):
+                if race.is_done:
+                    break
+                self.update(race)
+                taken += 1
+            # Sleep until the next step is due, but always yield to the other tasks.
+            await asyncio.sleep(max(0.0, start + taken * self.sleep - time.perf_counter()))
+        done.set()
+
+    async def _render(self, race: Race, done):
+        "Draws the latest state of the solvers, at most `fps` times a second."
+        interval = 1 / self.fps
+        while not done.is_set():
+            frame = time.perf_counter()
+            self._draw(race)
+            try:
+                await asyncio.wait_for(
+                    done.wait(), max(0.0, frame + interval - time.perf_counter())
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, done):
+        while not done.is_set():
+            self.poll()
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def surface(self, race: Race):
+        """
+        Gets what's being drawn: the race's grid, or the view given to `loop`. Either one has a
+        `canvas`, its size and `take_changes()`.
+        """
+        return race.grid if self.view is None else self.view
+
+    def markers(self, race: Race):
+        "Yields the canvas position of each solver in sight, as (X, Y, solver number)."
+        view = self.view
+        for i, solver in enumerate(race.solvers):
+            if view is None:
+                x, y = solver.pos
+                yield x * 4 + 2, y * 2 + 1, i
+                continue
+            position = view.to_canvas(solver.pos)
+            if position is not None:
+                yield position + (i,)
+
+    def changes(self, race: Race):
+        """
+        Gets the canvas positions that need to be redrawn from the grid's canvas before drawing
+        the solvers again: everything that changed in the grid, and wherever solvers were drawn
+        last time. Only the solvers themselves are redrawn each frame, never the whole maze, unless
+        a view had to scroll.
+        """
+        if self.view is not None:
+            self.view.follow(race.solvers[0].pos)
+        changes = self.surface(race).take_changes()
+        changes.update(self.last_positions)
+        self.last_positions = {(x, y) for x, y, _ in self.markers(race)}
+        if self.profile is not None:
+            self.profile.add("display.cells", len(changes))
+        return changes
+
+    def begin(self, race: Race):
+        "Called at the start of each loop, before anything is drawn."
+
+    def end(self, race: Race):
+        "Called at the end of each loop, after everything is drawn."
+
+    def poll(self):
+        "Checks for input, raising DisplayCloseError if the display should close."
 
-    def update(self, solver: Solver):
-        solver.step()
+    def update(self, race: Race):
+        race.step()
 
     @abc.abstractmethod
-    def draw(self, solver: Solver):
-        "Draws the given grid to this display"
+    def draw(self, race: Race):
+        "Draws the latest state of the race to this display"
@@ -1,6 +1,6 @@
 from bearlibterminal import terminal as blt
 from mazegen.grid import Grid
-from mazegen.solver import Solver
+from mazegen.race import Race
 from mazegen.display.exception import DisplayCloseError
 from mazegen.display.base import Display
 
@@ -9,53 +9,54 @@ __all__ = ('BearLibTermDisplay',)
 
 
 class BearLibTermDisplay(Display):
+    # The color of each solver, in order
+    COLORS = ("cyan", "magenta", "yellow", "green", "red", "blue")
+
     def __init__(self, settings=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.settings = settings or []
+        self.opened = False
+
+    def open(self):
+        "Opens the window, unless it's already open. Nothing is opened until the first loop."
+        if self.opened:
+            return
         assert blt.open() != 0
-        settings = settings or []
-        for setting in settings:
+        for setting in self.settings:
             blt.set(setting)
-        self.last_pos = None
+        self.opened = True
 
-    def loop(self, solver: Solver):
-        w = solver.grid.canvas_width
-        h = solver.grid.canvas_height
+    def begin(self, race: Race):
+        self.open()
+        w = self.surface(race).canvas_width
+        h = self.surface(race).canvas_height
         settings = "window.size={}x{}".format(w, h)
         blt.set(settings)
         blt.clear()
         blt.refresh()
 
-        canvas = solver.grid.draw()
-        for y, row in enumerate(canvas):
+        for y, row in enumerate(self.surface(race).canvas):
             for x, c in enumerate(row):
                 blt.put(x, y, ord(c))
-        super().loop(solver)
 
-    def update(self, solver: Solver):
+    def poll(self):
         while blt.has_input():
             key = blt.read()
             if key == blt.TK_ESCAPE:
                 raise DisplayCloseError()
 
-        super().update(solver)
-
-    def delay(self, duration=None):
-        duration = int((duration or self.sleep) * 1000)
-        blt.delay(duration)
-
-    def draw(self, solver: Solver):
-        if self.last_pos:
-            x, y = self.last_pos
-            blt.put(x, y, " ")
-
-        x, y = solver.pos
-        tx = x * 4 + 2
-        ty = y * 2 + 1
-        blt.color("cyan")
-        blt.put(tx, ty, "▪")
+    def draw(self, race: Race):
+        # Changes first, since a view may scroll and redraw its canvas
+        changes = self.changes(race)
+        canvas = self.surface(race).canvas
+        for x, y in changes:
+            blt.put(x, y, ord(canvas[y][x]))
+        for x, y, i in self.markers(race):
+            blt.color(self.COLORS[i % len(self.COLORS)])
+            blt.put(x, y, self.guy)
         blt.color("white")
-        self.last_pos = (tx, ty)
         blt.refresh()
 
     def __del__(self):
-        blt.close()
+        if self.opened:
+            blt.close()
@@ -1,38 +1,45 @@
 import curses
 from mazegen.grid import Grid
-from mazegen.solver import Solver
+from mazegen.race import Race
 from mazegen.display.base import Display
 from mazegen.display.exception import DisplayCloseError
 
+# The color of each solver, in order
+COLORS = (
+    curses.COLOR_CYAN,
+    curses.COLOR_MAGENTA,
+    curses.COLOR_YELLOW,
+    curses.COLOR_GREEN,
+    curses.COLOR_RED,
+    curses.COLOR_BLUE,
+)
+
+
 class CursesDisplay(Display):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.screen = curses.initscr()
         curses.start_color()
         curses.use_default_colors()
-        curses.init_pair(1, curses.COLOR_CYAN, -1)
+        for i, color in enumerate(COLORS):
+            curses.init_pair(i + 1, color, -1)
         curses.savetty()
         curses.noecho()
         curses.curs_set(0)
-        self.last_pos = None
 
-    def loop(self, solver: Solver):
+    def begin(self, race: Race):
         self.screen.clear()
-        canvas = solver.grid.draw()
-        for y, row in enumerate(canvas):
+        for y, row in enumerate(self.surface(race).canvas):
             self.screen.addstr(y, 0, "".join(row))
-        super().loop(solver)
-
-    def draw(self, solver: Solver):
-        if self.last_pos:
-            x, y = self.last_pos
-            self.screen.addstr(y, x, " ")
 
-        x, y = solver.pos
-        tx = x * 4 + 2
-        ty = y * 2 + 1
-        self.screen.addstr(ty, tx, self.guy, curses.color_pair(1))
-        self.last_pos = (tx, ty)
+    def draw(self, race: Race):
+        # Changes first, since a view may scroll and redraw its canvas
+        changes = self.changes(race)
+        canvas = self.surface(race).canvas
+        for x, y in changes:
+            self.screen.addstr(y, x, canvas[y][x])
+        for x, y, i in self.markers(race):
+            self.screen.addstr(y, x, self.guy, curses.color_pair(i % len(COLORS) + 1))
         self.screen.refresh()
 
     def __del__(self):
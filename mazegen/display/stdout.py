@@ -0,0 +1,41 @@
+import sys
+from mazegen.race import Race
+from mazegen.display.base import Display
+
+__all__ = ('StdoutDisplay',)
+
+
+class StdoutDisplay(Display):
+    """
+    A display that draws to STDOUT using ANSI escape codes. The maze is printed once per loop, and
+    every draw after that only moves the cursor to and rewrites the characters that changed.
+    """
+
+    # ANSI foreground colors for each solver: cyan, magenta, yellow, green, red, blue
+    COLORS = (36, 35, 33, 32, 31, 34)
+
+    def begin(self, race: Race):
+        # Clear the screen and draw the whole maze from the top-left corner
+        canvas = self.surface(race).canvas
+        sys.stdout.write("\u001b[2J\u001b[H" + "\n".join("".join(row) for row in canvas))
+
+    def end(self, race: Race):
+        # Leave the cursor below the maze
+        sys.stdout.write("\u001b[{};1H".format(self.surface(race).canvas_height + 1))
+        sys.stdout.flush()
+
+    def draw(self, race: Race):
+        # Changes first, since a view may scroll and redraw its canvas
+        changes = self.changes(race)
+        canvas = self.surface(race).canvas
+        out = []
+        for tx, ty in changes:
+            out.append("\u001b[{};{}H{}".format(ty + 1, tx + 1, canvas[ty][tx]))
+        for tx, ty, i in self.markers(race):
+            color = self.COLORS[i % len(self.COLORS)]
+            out.append("\u001b[{};{}H\u001b[{}m{}\u001b[0m".format(ty + 1, tx + 1, color, self.guy))
+        text = "".join(out)
+        if self.profile is not None:
+            self.profile.add("display.bytes", len(text.encode()))
+        sys.stdout.write(text)
+        sys.stdout.flush()
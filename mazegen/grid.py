@@ -1,6 +1,9 @@
-from enum import Enum, auto
+import codecs
+import random
+from enum import Enum
+from .rng import default_rng
 
-__all__ = ("Grid", "Wall")
+__all__ = ("Adjacency", "Grid", "Wall", "junction_indices", "render_rows")
 
 
 HORZ = "─"
@@ -54,6 +57,17 @@ WALL_CHARS = {
     (True, True, True, True): "┼",
 }
 
+# WALL_CHARS as a flat table, indexed by a 4-bit junction index: up = 1, right = 2, left = 4,
+# down = 8.
+JUNCTION_CHARS = tuple(
+    WALL_CHARS[tuple(bool(index & (1 << bit)) for bit in range(4))] for index in range(16)
+)
+JUNCTION_UP = 1
+JUNCTION_RIGHT = 2
+JUNCTION_LEFT = 4
+JUNCTION_DOWN = 8
+
+
 NW_CORNER = {
     (False, False): " ",
     (True, False): CAP_EAST,
@@ -85,10 +99,11 @@ SE_CORNER = {
 
 
 class Wall(Enum):
-    NORTH = auto()
-    EAST = auto()
-    SOUTH = auto()
-    WEST = auto()
+    # Values double as the bit for this wall in a cell's wall mask.
+    NORTH = 1
+    EAST = 2
+    SOUTH = 4
+    WEST = 8
 
     def opposite(self):
         if self is Wall.NORTH:
@@ -102,12 +117,76 @@ class Wall(Enum):
         assert False
 
 
+ALL_WALLS = Wall.NORTH.value | Wall.EAST.value | Wall.SOUTH.value | Wall.WEST.value
+# Maps a wall mask to the mask of the walls that are missing, for bytes.translate
+_OPEN_TABLE = bytes(~mask & ALL_WALLS for mask in range(256))
+# The number of bits set in each mask, i.e. the number of open directions in a passage mask
+DEGREE = bytes(bin(mask).count("1") for mask in range(256))
+
+
+class Adjacency:
+    """
+    A frozen index of which cells lead into which, built once from a grid's walls. Cells are
+    addressed by flat index, as with `Grid.index`, and moving through an open direction is a
+    table lookup and an addition.
+    """
+
+    __slots__ = ("_width", "_open", "_deltas", "_moves")
+
+    def __init__(self, width: int, passages):
+        self._width = width
+        self._open = bytes(passages)
+        # The index offset of a move through each wall bit
+        self._deltas = {
+            Wall.NORTH.value: -width,
+            Wall.EAST.value: 1,
+            Wall.SOUTH.value: width,
+            Wall.WEST.value: -1,
+        }
+        # The index offsets of the open neighbors for every open-direction mask
+        self._moves = tuple(
+            tuple(delta for bit, delta in self._deltas.items() if mask & bit)
+            for mask in range(16)
+        )
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def open(self) -> bytes:
+        """
+        The mask of open directions out of every cell, i.e. the walls that are missing, not
+        counting openings in the outer border.
+        """
+        return self._open
+
+    @property
+    def deltas(self):
+        "Maps each wall bit to the index offset of the neighbor on the other side of it."
+        return self._deltas
+
+    @property
+    def moves(self):
+        "The index offsets of the open neighbors for each of the 16 open-direction masks."
+        return self._moves
+
+    def __len__(self):
+        return len(self._open)
+
+
 class Cell:
-    def __init__(self, x: int, y: int, grid, walls=None):
+    """
+    A lightweight view of a single cell in a grid. Cells don't own any state; their walls live in
+    the grid's packed storage.
+    """
+
+    __slots__ = ("_x", "_y", "_grid")
+
+    def __init__(self, x: int, y: int, grid):
         self._x = x
         self._y = y
         self._grid = grid
-        self._walls = walls or set()
 
     @property
     def grid(self):
@@ -132,63 +211,113 @@ class Cell:
 
     @property
     def walls(self):
-        return self._walls
+        mask = self.grid.walls_at(self.x, self.y)
+        return frozenset(w for w in Wall if mask & w.value)
 
     def neighbor(self, wall: Wall):
-        if wall == Wall.NORTH and self.y > 0:
-            return self.cells[self.y - 1][self.x]
-        elif wall == Wall.EAST and self.x < self.grid.width - 1:
-            return self.cells[self.y][self.x + 1]
-        elif wall == Wall.SOUTH and self.y < self.grid.height - 1:
-            return self.cells[self.y + 1][self.x]
-        elif wall == Wall.WEST and self.x > 0:
-            return self.cells[self.y][self.x - 1]
-        else:
+        index = self.grid.neighbor_index(self.grid.index(self.x, self.y), wall)
+        if index is None:
             return None
+        y, x = divmod(index, self.grid.width)
+        return Cell(x, y, self.grid)
 
     def neighbors(self):
-        return dict(
-            list(
-                filter(lambda t: bool(t[1]), map(lambda w: (w, self.neighbor(w)), Wall))
-            )
-        )
+        return {w: n for w, n in ((w, self.neighbor(w)) for w in Wall) if n}
 
     def add_wall(self, wall: Wall):
-        self.walls.add(wall)
-        if wall == Wall.NORTH and self.y > 0:
-            self.cells[self.y - 1][self.x].walls.add(wall.SOUTH)
-        elif wall == Wall.SOUTH and self.y < len(self.cells) - 1:
-            self.cells[self.y + 1][self.x].walls.add(wall.NORTH)
-        elif wall == Wall.EAST and self.x < len(self.cells[0]) - 1:
-            self.cells[self.y][self.x + 1].walls.add(wall.WEST)
-        elif wall == Wall.WEST and self.x > 0:
-            self.cells[self.y][self.x - 1].walls.add(wall.EAST)
-        assert False
+        self.grid.add_wall(self.x, self.y, wall)
 
     def remove_wall(self, wall: Wall):
-        self.walls.remove(wall)
-        if wall == Wall.NORTH and self.y > 0:
-            self.cells[self.y - 1][self.x].walls.remove(wall.SOUTH)
-        elif wall == Wall.SOUTH and self.y < len(self.cells) - 1:
-            self.cells[self.y + 1][self.x].walls.remove(wall.NORTH)
-        elif wall == Wall.EAST and self.x < len(self.cells[0]) - 1:
-            self.cells[self.y][self.x + 1].walls.remove(wall.WEST)
-        elif wall == Wall.WEST and self.x > 0:
-            self.cells[self.y][self.x - 1].walls.remove(wall.EAST)
+        self.grid.remove_wall(self.x, self.y, wall)
+
+
+class _CellRow:
+    "A read-only row of cell views, so `grid.cells[y][x]` keeps working."
+
+    __slots__ = ("_grid", "_y")
+
+    def __init__(self, grid, y: int):
+        self._grid = grid
+        self._y = y
+
+    def __len__(self):
+        return self._grid.width
+
+    def __getitem__(self, x: int):
+        if x < 0:
+            x += self._grid.width
+        if not 0 <= x < self._grid.width:
+            raise IndexError(x)
+        return Cell(x, self._y, self._grid)
+
+
+class _CellRows:
+    "A read-only view of all rows of cells in a grid."
+
+    __slots__ = ("_grid",)
+
+    def __init__(self, grid):
+        self._grid = grid
+
+    def __len__(self):
+        return self._grid.height
+
+    def __getitem__(self, y: int):
+        if y < 0:
+            y += self._grid.height
+        if not 0 <= y < self._grid.height:
+            raise IndexError(y)
+        return _CellRow(self._grid, y)
 
 
 class Grid:
     def __init__(self, width: int, height: int):
         self._width = width
         self._height = height
-        cells = [
-            [Cell(x, y, self, set(Wall)) for x in range(width)] for y in range(height)
-        ]
-        self._cells = cells
+        # One byte per cell, row-major, holding that cell's wall mask. Shared walls are mirrored
+        # in both cells so that any cell can answer for its own walls.
+        self._walls = bytearray([ALL_WALLS]) * (width * height)
+        self._canvas = None
+        self._changes = set()
+        self._adjacency = None
+
+    @classmethod
+    def from_walls(cls, width: int, height: int, walls):
+        "Creates a grid from packed wall masks, like the ones in `Grid.walls`."
+        grid = cls(width, height)
+        if len(walls) != width * height:
+            raise ValueError(
+                "expected {} wall masks, got {}".format(width * height, len(walls))
+            )
+        grid._walls[:] = walls
+        return grid
+
+    @classmethod
+    def load(cls, path):
+        "Loads a grid from a maze file written by `Grid.save`."
+        from .storage import load
+
+        return load(path)
+
+    def save(self, path, algorithm: str = None, seed: int = None):
+        "Saves this grid to a compact binary maze file. See `mazegen.storage` for the format."
+        from .storage import save
+
+        save(self, path, algorithm, seed)
 
     @property
     def cells(self):
-        return self._cells
+        return _CellRows(self)
+
+    @property
+    def walls(self) -> bytearray:
+        """
+        The packed, row-major wall masks of every cell in this grid. Generators write to this
+        directly, and `MazeGenerator.generate` calls `invalidate()` once it's done. Anything else
+        that does so after the canvas or adjacency index has been built must call `invalidate()`,
+        or `wall_changed()` for each wall it changed.
+        """
+        return self._walls
 
     @property
     def width(self) -> int:
@@ -206,113 +335,351 @@ class Grid:
     def canvas_height(self) -> int:
         return self.height * 2 + 1
 
-    def draw(self):
-        global WALL_CHARS
-        cwidth = self.canvas_width
-        cheight = self.canvas_height
-        canvas = [[" " for _ in range(cwidth)] for _ in range(cheight)]
-
-        # Upper-left framing
-        for y in range(self.height):
-            ty = y * 2 + 1
-            cell = self.cells[y][0]
-            if Wall.WEST in cell.walls:
-                canvas[ty][0] = VERT
-        for x in range(self.width):
-            tx = x * 4 + 2
-            cell = self.cells[0][x]
-            if Wall.NORTH in cell.walls:
-                canvas[0][tx - 1] = HORZ
-                canvas[0][tx] = HORZ
-                canvas[0][tx + 1] = HORZ
-
-        # This gives us something that looks like this (sans the numbers):
-        #  ─── ───
-        # │ 1 │ 2 │
-        #  ─── ───
-        # │ 3 │ 4 │
-        #  ─── ───
-        for y in range(self.height):
-            for x in range(self.width):
-                cell = self.cells[y][x]
-                tx = x * 4 + 2
-                ty = y * 2 + 1
-                if Wall.EAST in cell.walls:
-                    canvas[ty][tx + 2] = VERT
-                if Wall.SOUTH in cell.walls:
-                    canvas[ty + 1][tx - 1] = HORZ
-                    canvas[ty + 1][tx] = HORZ
-                    canvas[ty + 1][tx + 1] = HORZ
-
-        # This part fills in the cracks of the above, except at the corners and sides.
-        for y in range(self.height - 1):
-            for x in range(self.width - 1):
-                tx = x * 4 + 2
-                ty = y * 2 + 1
-                # Cells 1, 2, 3, and 4 are the same as their labels above.
-                cell1, cell2, cell3, cell4 = (
-                    self.cells[y][x],
-                    self.cells[y][x + 1],
-                    self.cells[y + 1][x],
-                    self.cells[y + 1][x + 1],
-                )
-                walls = (
-                    Wall.EAST in cell1.walls,
-                    Wall.SOUTH in cell2.walls,
-                    Wall.NORTH in cell3.walls,
-                    Wall.WEST in cell4.walls,
-                )
-                char = WALL_CHARS[walls]
-                canvas[ty + 1][tx + 2] = char
-
-        # Fill in the sides
-        for y in range(self.height - 1):
-            ty = y * 2 + 1
-            cell1, cell2, cell3, cell4 = (
-                self.cells[y][self.width - 1],
-                self.cells[y][0],
-                self.cells[y + 1][self.width - 1],
-                self.cells[y + 1][0],
-            )
-            walls = (True, Wall.SOUTH in cell2.walls, False, Wall.WEST in cell4.walls)
-            char = WALL_CHARS[walls]
-            canvas[ty + 1][0] = char
-
-            walls = (Wall.EAST in cell1.walls, False, Wall.NORTH in cell3.walls, True)
-            char = WALL_CHARS[walls]
-            canvas[ty + 1][cwidth - 1] = char
-
-        for x in range(self.width - 1):
-            tx = x * 4 + 2
-            cell1, cell2, cell3, cell4 = (
-                self.cells[self.height - 1][x],
-                self.cells[self.height - 1][x + 1],
-                self.cells[0][x],
-                self.cells[0][x + 1],
-            )
-            walls = (Wall.EAST in cell1.walls, Wall.SOUTH in cell2.walls, True, False)
-            char = WALL_CHARS[walls]
-            canvas[cheight - 1][tx + 2] = char
-
-            walls = (False, True, Wall.NORTH in cell3.walls, Wall.WEST in cell4.walls)
-            char = WALL_CHARS[walls]
-            canvas[0][tx + 2] = char
-
-        # Corners
-        nw, ne, sw, se = (
-            self.cells[0][0],
-            self.cells[0][self.width - 1],
-            self.cells[self.height - 1][0],
-            self.cells[self.height - 1][self.width - 1],
-        )
-        nw_walls = (Wall.NORTH in nw.walls, Wall.WEST in nw.walls)
-        ne_walls = (Wall.NORTH in ne.walls, Wall.EAST in ne.walls)
-        sw_walls = (Wall.SOUTH in sw.walls, Wall.WEST in sw.walls)
-        se_walls = (Wall.SOUTH in se.walls, Wall.EAST in se.walls)
+    def index(self, x: int, y: int) -> int:
+        "Gets the flat index of the cell at the given position."
+        return y * self._width + x
+
+    def cell(self, x: int, y: int) -> Cell:
+        return Cell(x, y, self)
+
+    def walls_at(self, x: int, y: int) -> int:
+        "Gets the wall mask of the cell at the given position."
+        return self._walls[y * self._width + x]
+
+    def has_wall(self, x: int, y: int, wall: Wall) -> bool:
+        return bool(self._walls[y * self._width + x] & wall.value)
+
+    def neighbor_index(self, index: int, wall: Wall):
+        "Gets the flat index of the cell on the other side of a wall, or None at the border."
+        width = self._width
+        if wall is Wall.NORTH:
+            return index - width if index >= width else None
+        elif wall is Wall.EAST:
+            return index + 1 if index % width < width - 1 else None
+        elif wall is Wall.SOUTH:
+            return index + width if index < len(self._walls) - width else None
+        elif wall is Wall.WEST:
+            return index - 1 if index % width > 0 else None
+        assert False
 
-        canvas[0][0] = NW_CORNER[nw_walls]
-        canvas[0][cwidth - 1] = NE_CORNER[ne_walls]
-        canvas[cheight - 1][0] = SW_CORNER[sw_walls]
-        canvas[cheight - 1][cwidth - 1] = SE_CORNER[se_walls]
+    def carve(self, index: int, wall: Wall):
+        "Removes a wall from the cell at a flat index, along with its neighbor's matching wall."
+        walls = self._walls
+        walls[index] &= ~wall.value
+        other = self.neighbor_index(index, wall)
+        if other is not None:
+            walls[other] &= ~wall.opposite().value
+            self._adjacency = None
+        self._redraw_wall(index, wall)
+
+    def passages(self) -> bytearray:
+        """
+        Gets a mask for every cell of the directions that lead into another cell, i.e. the walls
+        that are missing, not counting openings in the outer border.
+        """
+        width, height = self._width, self._height
+        passages = self._walls.translate(_OPEN_TABLE)
+        north, east, south, west = (w.value for w in Wall)
+        for x in range(width):
+            passages[x] &= ~north
+            passages[(height - 1) * width + x] &= ~south
+        for y in range(height):
+            passages[y * width] &= ~west
+            passages[y * width + width - 1] &= ~east
+        return passages
+
+    def adjacency(self) -> Adjacency:
+        """
+        Gets the adjacency index of this grid's passages. It's built on first use and shared by
+        every caller until an interior wall changes, so solvers on the same maze don't each build
+        their own. Openings in the outer border, like the entrance and exit, don't affect it.
+        """
+        if self._adjacency is None:
+            self._adjacency = Adjacency(self._width, self.passages())
+        return self._adjacency
+
+    def braid(self, p: float = 1.0, rng: random.Random = None) -> int:
+        """
+        Removes dead ends, giving the maze loops. Each dead end is opened into one of its
+        neighbors with probability `p`, preferring neighbors that are dead ends too so that one
+        opening removes two. Dead ends are visited in random order, and any that earlier openings
+        already took care of are skipped. Returns the number of walls removed.
+        """
+        rng = rng if rng is not None else default_rng()
+        width, height = self._width, self._height
+        walls = self._walls
+        passages = self.passages()
+        dead_ends = [i for i, degree in enumerate(passages.translate(DEGREE)) if degree == 1]
+        rng.shuffle(dead_ends)
+        north, east, south, west = (w.value for w in Wall)
+        removed = 0
+        for index in dead_ends:
+            if DEGREE[passages[index]] != 1 or rng.random() >= p:
+                continue
+            y, x = divmod(index, width)
+            # The walls still standing between this cell and its neighbors
+            closed = []
+            if y > 0 and not passages[index] & north:
+                closed.append((north, south, -width))
+            if x < width - 1 and not passages[index] & east:
+                closed.append((east, west, 1))
+            if y < height - 1 and not passages[index] & south:
+                closed.append((south, north, width))
+            if x > 0 and not passages[index] & west:
+                closed.append((west, east, -1))
+            if not closed:
+                continue
+            dead = [wall for wall in closed if DEGREE[passages[index + wall[2]]] == 1]
+            bit, opposite, delta = rng.choice(dead or closed)
+            walls[index] &= ~bit
+            walls[index + delta] &= ~opposite
+            passages[index] |= bit
+            passages[index + delta] |= opposite
+            removed += 1
+        if removed:
+            self.invalidate()
+        return removed
+
+    def add_wall(self, x: int, y: int, wall: Wall):
+        walls = self._walls
+        index = y * self._width + x
+        walls[index] |= wall.value
+        other = self.neighbor_index(index, wall)
+        if other is not None:
+            walls[other] |= wall.opposite().value
+            self._adjacency = None
+        self._redraw_wall(index, wall)
+
+    def remove_wall(self, x: int, y: int, wall: Wall):
+        self.carve(y * self._width + x, wall)
+
+    def wall_changed(self, x: int, y: int, wall: Wall):
+        """
+        Tells the grid that a wall was written to `walls` directly, on both sides. The canvas is
+        patched around just that wall, so this is cheap no matter how big the grid is.
+        """
+        self._adjacency = None
+        self._redraw_wall(y * self._width + x, wall)
+
+    def rows(self):
+        "Yields the wall masks of each row of cells, top to bottom."
+        walls = memoryview(self._walls)
+        width = self._width
+        for y in range(self._height):
+            yield walls[y * width : (y + 1) * width]
 
-        return canvas
+    @property
+    def canvas(self):
+        """
+        The drawn canvas of this grid, as a list of rows of characters. This is built once and then
+        patched in place whenever a wall is added or removed through the grid, so it must not be
+        modified by callers. Writing to `walls` directly requires a call to `invalidate()`.
+        """
+        if self._canvas is None:
+            self._canvas = self.draw()
+            self._changes = set()
+        return self._canvas
+
+    def invalidate(self):
+        "Throws away the cached canvas and adjacency index, e.g. after modifying `walls` directly."
+        self._canvas = None
+        self._adjacency = None
+        self._changes = set()
+
+    def take_changes(self):
+        "Gets and clears the set of (X, Y) canvas positions that have changed since the last call."
+        changes = self._changes
+        self._changes = set()
+        return changes
+
+    def _junction(self, jx: int, jy: int) -> str:
+        "Gets the character of the junction at the top-left corner of the given cell position."
+        width, height, walls = self._width, self._height, self._walls
+
+        def mask(x, y):
+            if 0 <= x < width and 0 <= y < height:
+                return walls[y * width + x]
+            return None
+
+        return JUNCTION_CHARS[
+            junction_index(mask(jx - 1, jy - 1), mask(jx, jy - 1), mask(jx - 1, jy), mask(jx, jy))
+        ]
+
+    def _redraw_wall(self, index: int, wall: Wall):
+        "Patches the cached canvas around one wall of the cell at the given index."
+        canvas = self._canvas
+        if canvas is None:
+            return
+        y, x = divmod(index, self._width)
+        present = bool(self._walls[index] & wall.value)
+        if wall is Wall.NORTH or wall is Wall.SOUTH:
+            jy = y if wall is Wall.NORTH else y + 1
+            ty = jy * 2
+            char = HORZ if present else " "
+            for tx in range(x * 4 + 1, x * 4 + 4):
+                canvas[ty][tx] = char
+                self._changes.add((tx, ty))
+            junctions = ((x, jy), (x + 1, jy))
+        else:
+            jx = x if wall is Wall.WEST else x + 1
+            tx, ty = jx * 4, y * 2 + 1
+            canvas[ty][tx] = VERT if present else " "
+            self._changes.add((tx, ty))
+            junctions = ((jx, y), (jx, y + 1))
+        for jx, jy in junctions:
+            canvas[jy * 2][jx * 4] = self._junction(jx, jy)
+            self._changes.add((jx * 4, jy * 2))
+
+    def draw(self):
+        "Draws this grid to a new canvas, as a list of rows of characters."
+        return [list(line) for line in render_rows(self._width, self.rows())]
+
+    def render(self) -> str:
+        "Draws this grid to a single string, with one line per canvas row."
+        return "\n".join(render_rows(self._width, self.rows()))
+
+
+def junction_index(nw, ne, sw, se) -> int:
+    """
+    Gets the JUNCTION_CHARS index of the junction between four cells, given their wall masks.
+    Cells that fall outside of the grid are None.
+    """
+    north, east, south, west = (w.value for w in Wall)
+    nw_, ne_, sw_, se_ = nw or 0, ne or 0, sw or 0, se or 0
+    index = 0
+    if nw_ & east or ne_ & west:
+        index |= JUNCTION_UP
+    if ne_ & south or se_ & north:
+        index |= JUNCTION_RIGHT
+    if nw_ & south or sw_ & north:
+        index |= JUNCTION_LEFT
+    if sw_ & east or se_ & west:
+        index |= JUNCTION_DOWN
+
+    # Junctions along the border (but not the corners) always draw the border line running
+    # clockwise out of them.
+    top, bottom = nw is None and ne is None, sw is None and se is None
+    left, right = nw is None and sw is None, ne is None and se is None
+    if top and not (left or right):
+        index |= JUNCTION_RIGHT
+    elif right and not (top or bottom):
+        index |= JUNCTION_DOWN
+    elif bottom and not (left or right):
+        index |= JUNCTION_LEFT
+    elif left and not (top or bottom):
+        index |= JUNCTION_UP
+    return index
+
+
+def _junction_table(masks):
+    "Builds a bytes.translate table mapping a cell's wall mask to its share of a junction index."
+    masks = [(wall.value, bit) for wall, bit in masks]
+    return bytes(sum(bit for wall, bit in masks if mask & wall) for mask in range(256))
+
+
+# Each cell's contribution to the index of the junction at each of its corners. The walls are
+# mirrored between neighbors, so any one of the cells sharing a segment can answer for it.
+_NW_JUNCTION = _junction_table(((Wall.EAST, JUNCTION_UP), (Wall.SOUTH, JUNCTION_LEFT)))
+_NE_JUNCTION = _junction_table(((Wall.WEST, JUNCTION_UP), (Wall.SOUTH, JUNCTION_RIGHT)))
+_SW_JUNCTION = _junction_table(((Wall.EAST, JUNCTION_DOWN), (Wall.NORTH, JUNCTION_LEFT)))
+_SE_JUNCTION = _junction_table(((Wall.WEST, JUNCTION_DOWN), (Wall.NORTH, JUNCTION_RIGHT)))
+# Lines are built as one byte code per character and then decoded through _CANVAS_CODEC: codes 0
+# to 15 are junctions, and the rest are the plain wall characters.
+_HORZ_CODE = 0x10
+_VERT_CODE = 0x11
+_SPACE_CODE = 0x20
+_CANVAS_CODEC = "".join(JUNCTION_CHARS) + HORZ + VERT + "\ufffe" * 14 + " " + "\ufffe" * 223
+# Horizontal wall segments under a row (south) or over it (north), and vertical ones to the east
+_SOUTH_SEGMENT = bytes(_HORZ_CODE if m & Wall.SOUTH.value else _SPACE_CODE for m in range(256))
+_NORTH_SEGMENT = bytes(_HORZ_CODE if m & Wall.NORTH.value else _SPACE_CODE for m in range(256))
+_EAST_SEGMENT = bytes(_VERT_CODE if m & Wall.EAST.value else _SPACE_CODE for m in range(256))
+
+
+def _decode_canvas(codes) -> str:
+    return codecs.charmap_decode(codes, "strict", _CANVAS_CODEC)[0]
+
+
+def or_bytes(*parts) -> bytes:
+    "Bitwise ORs byte strings of the same length together."
+    value = 0
+    for part in parts:
+        value |= int.from_bytes(part, "little")
+    return value.to_bytes(len(parts[0]), "little")
+
+
+def junction_indices(width: int, above, below) -> bytes:
+    """
+    Gets the JUNCTION_CHARS index of every junction between two rows of wall masks, either of
+    which may be None along the top and bottom. The indices are all worked out at once by
+    translating each row through its corner's table and ORing the results together.
+    """
+    empty = bytes(width)
+    up = bytes(above) if above is not None else empty
+    down = bytes(below) if below is not None else empty
+
+    # Junctions along the border (but not the corners) always draw the border line running
+    # clockwise out of them, the same as junction_index.
+    forced = bytearray(width + 1)
+    if above is None:
+        forced[1:width] = bytes([JUNCTION_RIGHT]) * (width - 1)
+    elif below is None:
+        forced[1:width] = bytes([JUNCTION_LEFT]) * (width - 1)
+    else:
+        forced[0] = JUNCTION_UP
+        forced[width] = JUNCTION_DOWN
+
+    return or_bytes(
+        b"\0" + up.translate(_NW_JUNCTION),
+        up.translate(_NE_JUNCTION) + b"\0",
+        b"\0" + down.translate(_SW_JUNCTION),
+        down.translate(_SE_JUNCTION) + b"\0",
+        forced,
+    )
+
+
+def _junction_line(width: int, above, below) -> str:
+    "Renders the line of junctions and horizontal walls between two rows of wall masks."
+    codes = junction_indices(width, above, below)
+    if above is not None:
+        segments = bytes(above).translate(_SOUTH_SEGMENT)
+    else:
+        segments = bytes(below).translate(_NORTH_SEGMENT)
+    line = bytearray(width * 4 + 1)
+    line[0::4] = codes
+    line[1::4] = segments
+    line[2::4] = segments
+    line[3::4] = segments
+    return _decode_canvas(line)
+
+
+def _cell_line(row) -> str:
+    "Renders the line through the middle of a row of wall masks."
+    row = bytes(row)
+    line = bytearray([_SPACE_CODE]) * (len(row) * 4 + 1)
+    if row[0] & Wall.WEST.value:
+        line[0] = _VERT_CODE
+    line[4::4] = row.translate(_EAST_SEGMENT)
+    return _decode_canvas(line)
+
+
+def render_rows(width: int, rows, above=None, below=None, left: bool = False, right: bool = False):
+    """
+    Renders an iterable of rows of cell wall masks to lines of text, yielding each line as soon as
+    it's known. This draws the same picture as `Grid.draw`, but only ever holds two rows.
+
+    To draw a window onto part of a bigger grid, give the cells around it: `above` and `below`
+    are the rows just outside it, and with `left` or `right`, every row (including those two)
+    has an extra cell on that side. The window's edges are then drawn the way the whole grid
+    draws them there, and only treated as the outer wall where nothing is given beyond them.
+    """
+    start = 1 if left else 0
+    wide = width + start + (1 if right else 0)
+    # The junction lines are drawn across the extra cells, then cut back to the window
+    first, last = start * 4, (start + width) * 4 + 1
+    previous = None
+    for row in rows:
+        yield _junction_line(wide, above if previous is None else previous, row)[first:last]
+        yield _cell_line(row[start : start + width])
+        previous = row
+    if previous is not None:
+        yield _junction_line(wide, previous, below)[first:last]
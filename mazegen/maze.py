@@ -1,45 +1,409 @@
 import abc
 import random
+from collections import deque
 from .grid import *
+from .registry import LazyRegistry
+from .rng import BitStream, default_rng
 
 
 class MazeGenerator(metaclass=abc.ABCMeta):
     """
-    An abstract maze generator.
+    An abstract maze generator. Generators draw from their own random number generator, which is
+    seeded from the global `random` module unless one is given.
     """
 
-    def __init__(self, grid: Grid):
+    def __init__(self, grid: Grid, rng: random.Random = None):
         self._grid = grid
+        self._rng = rng if rng is not None else default_rng()
 
     @property
     def grid(self) -> Grid:
         return self._grid
 
-    @abc.abstractmethod
+    @property
+    def rng(self) -> random.Random:
+        return self._rng
+
     def generate(self):
         """
-        Generates the maze.
+        Generates the maze. Anything the grid had cached about its walls is thrown away after.
+        """
+        # Run the carving to the end without keeping any of it
+        deque(self._carve(), maxlen=0)
+        self.grid.invalidate()
+
+    def steps(self):
+        """
+        Generates the maze one wall at a time, yielding (X, Y, wall) just after each wall is
+        removed, so that it can be watched as it's carved. Walls are written straight to the grid,
+        so anything showing the grid should pass each one on to `Grid.wall_changed`.
+        """
+        width = self.grid.width
+        walls = {w.value: w for w in Wall}
+        for index, bit in self._carve():
+            y, x = divmod(index, width)
+            yield x, y, walls[bit]
+
+    @abc.abstractmethod
+    def _carve(self):
+        """
+        A generator that generates the maze, yielding (flat index, wall bit) just after removing
+        each wall, from both of the cells it separates.
         """
 
 
+def open_walls(grid: Grid, start: int = 0, stop: int = None):
+    """
+    Yields (flat index, wall bit) for every open north and east wall between cells in the given
+    rows, in row-major order. This stands in for the carving of generators that work on whole rows
+    or the whole grid at once.
+    """
+    walls, width = grid.walls, grid.width
+    north, east = Wall.NORTH.value, Wall.EAST.value
+    stop = grid.height if stop is None else stop
+    for y in range(start, stop):
+        for index in range(y * width, (y + 1) * width):
+            if y and not walls[index] & north:
+                yield index, north
+            if index % width < width - 1 and not walls[index] & east:
+                yield index, east
+
+
 class DepthFirst(MazeGenerator):
     """
     A non-recursive depth-first maze generator.
     """
 
-    def generate(self):
-        visited = set()
-        stack = [(0, 0)]
+    def _carve(self):
+        grid = self.grid
+        walls = grid.walls
+        width = grid.width
+        size = width * grid.height
+        north, east, south, west = (w.value for w in Wall)
+        # The neighbor's opposite wall bit and index offset for each wall bit
+        steps = {north: (south, -width), east: (west, 1), south: (north, width), west: (east, -1)}
+        pick = BitStream(self.rng).pick
+        visited = bytearray(size)
+        stack = [0]
 
         while stack:
-            x, y = pos = stack.pop()
-            visited.add(pos)
-            cell = self.grid.cells[y][x]
-            neighbors = [(w, n) for w, n in cell.neighbors().items() if n.pos not in visited]
-            if not neighbors:
+            index = stack.pop()
+            visited[index] = 1
+            x = index % width
+            # The walls leading to unvisited neighbors
+            unvisited = 0
+            if index >= width and not visited[index - width]:
+                unvisited |= north
+            if x < width - 1 and not visited[index + 1]:
+                unvisited |= east
+            if index < size - width and not visited[index + width]:
+                unvisited |= south
+            if x > 0 and not visited[index - 1]:
+                unvisited |= west
+            if not unvisited:
                 continue
             # choose a neighbor
-            direction, chosen = random.choice(neighbors)
-            cell.remove_wall(direction)
-            stack.append(cell.pos)
-            stack.append(chosen.pos)
+            wall = pick(unvisited)
+            opposite, delta = steps[wall]
+            walls[index] &= ~wall
+            walls[index + delta] &= ~opposite
+            yield index, wall
+            stack.append(index)
+            stack.append(index + delta)
+
+
+class Kruskal(MazeGenerator):
+    """
+    A randomized Kruskal's maze generator. Walls are knocked down in random order whenever they
+    separate two cells that aren't connected yet, tracked with a union-find.
+    """
+
+    def _carve(self):
+        grid = self.grid
+        walls = grid.walls
+        width = grid.width
+        size = width * grid.height
+        north, east, south, west = (w.value for w in Wall)
+
+        # Each interior wall is encoded as `index * 2` for its east wall and `index * 2 + 1` for
+        # its south wall.
+        edges = []
+        for index in range(size):
+            if index % width < width - 1:
+                edges.append(index * 2)
+            if index < size - width:
+                edges.append(index * 2 + 1)
+        self.rng.shuffle(edges)
+        parent = list(range(size))
+
+        def find(index):
+            # Path halving keeps the trees flat without recursion.
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        remaining = size - 1
+        for edge in edges:
+            if not remaining:
+                break
+            index, is_south = divmod(edge, 2)
+            other = index + width if is_south else index + 1
+            root, other_root = find(index), find(other)
+            if root == other_root:
+                continue
+            parent[other_root] = root
+            remaining -= 1
+            if is_south:
+                walls[index] &= ~south
+                walls[other] &= ~north
+                yield index, south
+            else:
+                walls[index] &= ~east
+                walls[other] &= ~west
+                yield index, east
+
+
+class Prim(MazeGenerator):
+    """
+    A randomized Prim's maze generator. The maze grows outward from a single cell by connecting a
+    random cell from its frontier each step.
+    """
+
+    def _carve(self):
+        grid = self.grid
+        walls = grid.walls
+        width = grid.width
+        size = width * grid.height
+        north, east, south, west = (w.value for w in Wall)
+        steps = {north: (south, -width), east: (west, 1), south: (north, width), west: (east, -1)}
+        rng = self.rng
+        pick = BitStream(rng).pick
+        # 0 = untouched, 1 = on the frontier, 2 = part of the maze
+        state = bytearray(size)
+        frontier = []
+
+        def neighbors(index):
+            x = index % width
+            if index >= width:
+                yield north, south, index - width
+            if x < width - 1:
+                yield east, west, index + 1
+            if index < size - width:
+                yield south, north, index + width
+            if x > 0:
+                yield west, east, index - 1
+
+        def add(index):
+            state[index] = 2
+            for _, _, other in neighbors(index):
+                if not state[other]:
+                    state[other] = 1
+                    frontier.append(other)
+
+        add(rng.randrange(size))
+        while frontier:
+            # Swap-remove a random frontier cell so that picking stays O(1).
+            chosen = rng.randrange(len(frontier))
+            frontier[chosen], frontier[-1] = frontier[-1], frontier[chosen]
+            index = frontier.pop()
+            # Connect it to one of its neighbors that's already part of the maze
+            joined = 0
+            for wall, _, other in neighbors(index):
+                if state[other] == 2:
+                    joined |= wall
+            wall = pick(joined)
+            opposite, delta = steps[wall]
+            walls[index] &= ~wall
+            walls[index + delta] &= ~opposite
+            yield index, wall
+            add(index)
+
+
+class Eller(MazeGenerator):
+    """
+    An Eller's maze generator. The maze is built one row at a time, keeping only the current row's
+    sets in memory, so it runs in O(width) memory for any height.
+    """
+
+    def generate(self):
+        grid = self.grid
+        width = grid.width
+        walls = grid.walls
+        for y, row in enumerate(Eller.rows(width, grid.height, self.rng)):
+            walls[y * width : (y + 1) * width] = row
+        grid.invalidate()
+
+    def _carve(self):
+        grid = self.grid
+        width = grid.width
+        walls = grid.walls
+        for y, row in enumerate(Eller.rows(width, grid.height, self.rng)):
+            walls[y * width : (y + 1) * width] = row
+            # Rows are finished all at once, joining the row above as they go
+            yield from open_walls(grid, y, y + 1)
+
+    @staticmethod
+    def rows(width: int, height: int, rng: random.Random = None):
+        """
+        Yields the wall masks of each row as `bytes`, top to bottom, as soon as the row is
+        finished.
+        """
+        rng = rng if rng is not None else default_rng()
+        coin = BitStream(rng).bit
+        north, east, south, west = (w.value for w in Wall)
+        all_walls = north | east | south | west
+        # The set that each column of the current row belongs to, and the columns in each set.
+        sets = list(range(width))
+        members = {s: [s] for s in sets}
+        next_set = width
+        above = bytes([all_walls]) * width
+
+        for y in range(height):
+            last = y == height - 1
+            row = bytearray([all_walls]) * width
+            for x, mask in enumerate(above):
+                if not mask & south:
+                    row[x] &= ~north
+
+            # Join adjacent cells in different sets. The last row must join everything.
+            for x in range(width - 1):
+                if sets[x] == sets[x + 1] or not (last or coin()):
+                    continue
+                row[x] &= ~east
+                row[x + 1] &= ~west
+                keep, drop = sets[x], sets[x + 1]
+                if len(members[keep]) < len(members[drop]):
+                    keep, drop = drop, keep
+                for column in members.pop(drop):
+                    sets[column] = keep
+                    members[keep].append(column)
+
+            if not last:
+                # Every set has to continue downward through at least one of its cells; the rest
+                # of the row starts out in new sets of its own.
+                below = [None] * width
+                for columns in members.values():
+                    rng.shuffle(columns)
+                    for i, column in enumerate(columns):
+                        if i == 0 or coin():
+                            row[column] &= ~south
+                            below[column] = sets[column]
+                for x in range(width):
+                    if below[x] is None:
+                        below[x] = next_set
+                        next_set += 1
+                sets = below
+                members = {}
+                for x, s in enumerate(sets):
+                    members.setdefault(s, []).append(x)
+
+            above = bytes(row)
+            yield above
+
+
+class Wilson(MazeGenerator):
+    """
+    A Wilson's maze generator. Cells join the maze through loop-erased random walks, which produces
+    a uniformly random spanning tree.
+    """
+
+    def _carve(self):
+        grid = self.grid
+        walls = grid.walls
+        width = grid.width
+        size = width * grid.height
+        north, east, south, west = (w.value for w in Wall)
+        in_maze = bytearray(size)
+        # The direction last taken out of each cell on the current walk. Overwriting it when the
+        # walk revisits a cell is what erases loops.
+        exits = bytearray(size)
+        steps = {
+            north: (south, -width),
+            east: (west, 1),
+            south: (north, width),
+            west: (east, -1),
+        }
+
+        # The directions a walk can take out of each cell without leaving the grid
+        directions = bytearray([north | east | south | west]) * size
+        for x in range(width):
+            directions[x] &= ~north
+            directions[size - width + x] &= ~south
+        for index in range(0, size, width):
+            directions[index] &= ~west
+            directions[index + width - 1] &= ~east
+        pick = BitStream(self.rng).pick
+
+        in_maze[self.rng.randrange(size)] = 1
+        for start in range(size):
+            if in_maze[start]:
+                continue
+            index = start
+            while not in_maze[index]:
+                wall = pick(directions[index])
+                exits[index] = wall
+                index += steps[wall][1]
+
+            # Retrace the loop-erased walk and carve it into the maze.
+            index = start
+            while not in_maze[index]:
+                wall = exits[index]
+                opposite, delta = steps[wall]
+                in_maze[index] = 1
+                walls[index] &= ~wall
+                walls[index + delta] &= ~opposite
+                yield index, wall
+                index += delta
+
+
+class Carving:
+    """
+    Runs a generator one wall at a time behind the same interface as a solver (`grid`, `pos`,
+    `is_done` and `step()`), so that displays can animate the carving. Every step removes one
+    wall and patches the grid's canvas around it, and the position is the cell just carved from.
+    """
+
+    def __init__(self, generator: MazeGenerator):
+        self._grid = generator.grid
+        self._steps = generator.steps()
+        self._pos = (0, 0)
+        self._done = False
+
+    @property
+    def grid(self) -> Grid:
+        return self._grid
+
+    @property
+    def pos(self):
+        return self._pos
+
+    @property
+    def is_done(self) -> bool:
+        return self._done
+
+    def step(self):
+        if self._done:
+            return
+        try:
+            x, y, wall = next(self._steps)
+        except StopIteration:
+            self._done = True
+            return
+        self._grid.wall_changed(x, y, wall)
+        self._pos = (x, y)
+
+
+GENERATORS = LazyRegistry(__package__)
+GENERATORS.update(
+    {
+        "depth-first": DepthFirst,
+        "kruskal": Kruskal,
+        "prim": Prim,
+        "eller": Eller,
+        "wilson": Wilson,
+    }
+)
+# NumPy-backed generators are optional, and NumPy is only imported when one is used
+GENERATORS.register("sidewinder", ".vectorized", "Sidewinder", requires="numpy")
+GENERATORS.register("binary-tree", ".vectorized", "BinaryTree", requires="numpy")
@@ -0,0 +1,140 @@
+"""
+A pool of mazes generated ahead of time. A background thread keeps a few mazes ready while the
+current one is being solved, so that moving on to the next maze doesn't have to wait for it to be
+generated.
+"""
+import threading
+import time
+from collections import deque
+
+__all__ = ("MazePool",)
+
+# A marker for the end of the mazes
+_DONE = object()
+
+
+def _footprint(item) -> int:
+    """
+    Estimates the memory a pooled maze takes up, in bytes: its wall masks, and the adjacency index
+    of the same size that analyzing it builds.
+    """
+    _, grid, analysis = item
+    cells = grid.width * grid.height
+    return cells * 2 if analysis is not None else cells
+
+
+class MazePool:
+    """
+    Keeps up to `depth` mazes ready, taken from `mazes` by a background thread. `mazes` is any
+    iterable of (index, grid, analysis) tuples, and is only ever iterated over by that thread.
+
+    With `max_bytes`, the thread also stops taking mazes while the ones that are ready would take
+    up more memory than that with another one like them added. There's always room for at least
+    one maze, however big it is.
+
+    Anything raised while getting a maze is raised again from `get()`, in order.
+    """
+
+    def __init__(self, mazes, depth: int = 2, max_bytes: int = None):
+        self._mazes = iter(mazes)
+        self._depth = max(1, depth)
+        self._max_bytes = max_bytes
+        self._ready = deque()
+        self._bytes = 0
+        # The footprint of the last maze taken, as a guess at the next one's
+        self._last = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self.waited = 0.0
+        self._thread = threading.Thread(target=self._fill, name="maze-pool", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self) -> int:
+        "The number of mazes ready to be taken."
+        return len(self._ready)
+
+    @property
+    def bytes(self) -> int:
+        "The estimated memory taken up by the mazes that are ready."
+        return self._bytes
+
+    def _full(self) -> bool:
+        if not self._ready:
+            return False
+        if len(self._ready) >= self._depth:
+            return True
+        return self._max_bytes is not None and self._bytes + self._last > self._max_bytes
+
+    def _fill(self):
+        condition = self._condition
+        while True:
+            with condition:
+                while self._full() and not self._closed:
+                    condition.wait()
+                if self._closed:
+                    return
+            try:
+                item = next(self._mazes, _DONE)
+                size = 0 if item is _DONE else _footprint(item)
+            except BaseException as e:
+                # Pass the error on, and end there
+                with condition:
+                    self._ready.extend([(e, 0), (_DONE, 0)])
+                    condition.notify_all()
+                return
+            with condition:
+                if self._closed:
+                    return
+                self._ready.append((item, size))
+                self._bytes += size
+                self._last = size or self._last
+                condition.notify_all()
+            if item is _DONE:
+                return
+
+    def get(self):
+        """
+        Takes the next maze, waiting for it if none are ready, as an (index, grid, analysis)
+        tuple. Raises StopIteration once there are no more.
+        """
+        condition = self._condition
+        with condition:
+            if not self._ready:
+                start = time.perf_counter()
+                while not self._ready:
+                    condition.wait()
+                self.waited += time.perf_counter() - start
+            item, size = self._ready[0]
+            if item is _DONE:
+                raise StopIteration
+            self._ready.popleft()
+            self._bytes -= size
+            condition.notify_all()
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.get()
+            except StopIteration:
+                return
+
+    def close(self):
+        """
+        Stops taking mazes and lets go of the ones that are ready. A maze being generated is
+        finished in the background, then thrown away.
+        """
+        with self._condition:
+            self._closed = True
+            self._ready.clear()
+            self._bytes = 0
+            self._condition.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,156 @@
+"""
+Profiling. A `Profile` collects how long each phase of a run took, along with counters for what
+happened in it: walls carved, steps taken, backtracks, branches registered, frames drawn and what
+each frame cost. It can also run the whole thing under cProfile and save the stats for `pstats`.
+
+The hot paths aren't instrumented at all. Counters are read off of the state that generators and
+solvers already keep once a phase is over, and displays only read the clock once per frame when
+they're given a profile, so a run costs the same as ever with profiling turned off.
+"""
+import cProfile
+import threading
+import time
+from contextlib import contextmanager
+from .grid import *
+from .grid import DEGREE
+
+__all__ = ("Profile", "solver_counters")
+
+
+def solver_counters(solver):
+    """
+    Gets counters for a solver, or a race of several, from the state it keeps anyway: the steps
+    each took, and for `Solver`, how many of those were backtracks and how many branches it
+    registered. Every step pushes onto or pops off of its backtrack stack, so the backtracks are
+    whatever the stack doesn't account for.
+    """
+    counters = {}
+    solvers = getattr(solver, "solvers", [solver])
+    steps = getattr(solver, "steps", None)
+    for i, each in enumerate(solvers):
+        taken = steps[i] if isinstance(steps, list) else getattr(each, "steps", None)
+        if taken is not None:
+            counters["steps"] = counters.get("steps", 0) + taken
+        branches = getattr(each, "_branches", None)
+        backtrack = getattr(each, "_backtrack", None)
+        if isinstance(branches, bytearray) and backtrack is not None and taken is not None:
+            counters["backtracks"] = counters.get("backtracks", 0) + (taken - len(backtrack)) // 2
+            counters["branches"] = counters.get("branches", 0) + len(branches) - branches.count(0)
+    return counters
+
+
+class Profile:
+    """
+    Timers and counters for one run. Phases are timed with `with profile.phase(name):`, and can be
+    entered any number of times. With `cprofile`, everything between `start()` and `stop()` also
+    runs under cProfile.
+
+    Timers and counters can be added to from several threads at once, like a pool generating
+    mazes in the background, but cProfile only profiles the thread that called `start()`.
+    """
+
+    def __init__(self, cprofile: bool = False):
+        self._phases = {}
+        self._counters = {}
+        # The number of frames drawn, and their total and longest times
+        self._frames = [0, 0.0, 0.0]
+        self._lock = threading.Lock()
+        self._profiler = cProfile.Profile() if cprofile else None
+        self._start = None
+        self.elapsed = 0.0
+
+    @property
+    def phases(self):
+        "The (calls, seconds) of each phase, by name."
+        return self._phases
+
+    @property
+    def counters(self):
+        return self._counters
+
+    @property
+    def frames(self):
+        "The number of frames displays drew, and their total and longest times in seconds."
+        return tuple(self._frames)
+
+    def start(self):
+        self._start = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.enable()
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._start is not None:
+            self.elapsed += time.perf_counter() - self._start
+            self._start = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        "Adds time spent in a phase that was timed somewhere else, like a worker process."
+        with self._lock:
+            previous_calls, previous = self._phases.get(name, (0, 0.0))
+            self._phases[name] = (previous_calls + calls, previous + seconds)
+
+    def add(self, name: str, value=1):
+        "Adds to a counter."
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def update(self, prefix: str, counters):
+        "Adds every counter in a dict, with its name prefixed by `prefix` and a dot."
+        for name, value in counters.items():
+            self.add("{}.{}".format(prefix, name), value)
+
+    def frame(self, seconds: float):
+        "Records how long a display took to draw a frame."
+        frames = self._frames
+        with self._lock:
+            frames[0] += 1
+            frames[1] += seconds
+            frames[2] = max(frames[2], seconds)
+
+    def carved(self, grid: Grid):
+        "Counts the walls a generator carved out of a grid, from its adjacency index."
+        self.add("generate.walls", sum(grid.adjacency().open.translate(DEGREE)) // 2)
+        self.add("generate.cells", grid.width * grid.height)
+
+    def dump(self, path):
+        "Saves the cProfile stats, to be read with `pstats`."
+        self._profiler.dump_stats(path)
+
+    def summary(self) -> str:
+        "Formats the phases, counters and frame times as a table."
+        lines = ["{:<24}{:>10}{:>12}{:>8}".format("phase", "calls", "seconds", "share")]
+        # Shares are of the time spent in phases, which can add up to more than the elapsed time
+        # when they ran in several processes at once.
+        total = sum(seconds for _, seconds in self._phases.values()) or 1e-9
+        for name, (calls, seconds) in self._phases.items():
+            lines.append(
+                "{:<24}{:>10}{:>12.4f}{:>7.1f}%".format(name, calls, seconds, seconds / total * 100)
+            )
+        if self.elapsed:
+            lines.append("{:<24}{:>10}{:>12.4f}".format("total", "", self.elapsed))
+        frames, seconds, longest = self._frames
+        if frames:
+            lines.append(
+                "frames: {} at {:.3f}ms mean, {:.3f}ms max".format(
+                    frames, seconds / frames * 1000, longest * 1000
+                )
+            )
+            if "display.bytes" in self._counters:
+                lines.append(
+                    "bytes per frame: {:.1f}".format(self._counters["display.bytes"] / frames)
+                )
+        if self._counters:
+            lines.append("{:<24}{:>14}".format("counter", "value"))
+            for name, value in sorted(self._counters.items()):
+                lines.append("{:<24}{:>14}".format(name, value))
+        return "\n".join(lines)
@@ -0,0 +1,90 @@
+"""
+Races between several solvers working through the same grid at once.
+"""
+
+__all__ = ("Race",)
+
+
+class Race:
+    """
+    Several solvers stepping through one shared grid in lockstep. The grid isn't copied; solvers
+    only read from it once they've opened the entrance and exit.
+    """
+
+    def __init__(self, solvers, names=None):
+        solvers = list(solvers)
+        if not solvers:
+            raise ValueError("a race needs at least one solver")
+        grid = solvers[0].grid
+        if any(solver.grid is not grid for solver in solvers):
+            raise ValueError("every solver in a race must share the same grid")
+        self._solvers = solvers
+        self._names = list(names) if names else [type(s).__name__ for s in solvers]
+        self._steps = [0] * len(solvers)
+        self._running = [i for i, solver in enumerate(solvers) if not solver.is_done]
+
+    @property
+    def grid(self):
+        return self._solvers[0].grid
+
+    @property
+    def solvers(self):
+        return self._solvers
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def steps(self):
+        "The number of steps each solver has taken so far."
+        return self._steps
+
+    @property
+    def is_done(self) -> bool:
+        return not self._running
+
+    def step(self):
+        "Steps every solver that isn't done yet."
+        solvers, steps = self._solvers, self._steps
+        for i in self._running:
+            solvers[i].step()
+            steps[i] += 1
+        if any(solvers[i].is_done for i in self._running):
+            self._running = [i for i in self._running if not solvers[i].is_done]
+
+    def run(self):
+        "Runs the race to the end, returning the leaderboard."
+        while self._running:
+            self.step()
+        return self.leaderboard()
+
+    def leaderboard(self):
+        """
+        Gets a (place, name, steps, done) tuple for each solver. Solvers that are done come first
+        by the number of steps they took, with ties sharing a place.
+        """
+        order = sorted(
+            range(len(self._solvers)),
+            key=lambda i: (not self._solvers[i].is_done, self._steps[i]),
+        )
+        board = []
+        for rank, i in enumerate(order):
+            done = self._solvers[i].is_done
+            place = rank + 1
+            if board and board[-1][3] == done and board[-1][2] == self._steps[i]:
+                place = board[-1][0]
+            board.append((place, self._names[i], self._steps[i], done))
+        return board
+
+    def format_leaderboard(self) -> str:
+        "Formats the leaderboard as a table, one line per solver."
+        width = max(len(name) for name in self._names)
+        lines = []
+        for place, name, steps, done in self.leaderboard():
+            lines.append(
+                "{:>3}. {:<{}}  {:>10,} steps{}".format(
+                    place, name, width, steps, "" if done else " (unfinished)"
+                )
+            )
+        return "\n".join(lines)
@@ -0,0 +1,58 @@
+"""
+Registries of named classes that are only imported when they're first looked up, so that optional
+and heavy dependencies like NumPy, curses and bearlibterminal cost nothing at startup unless
+they're used.
+"""
+import importlib
+from importlib.util import find_spec
+
+__all__ = ("LazyRegistry",)
+
+
+class LazyRegistry(dict):
+    """
+    A dict of names to classes, where entries can be registered by where they live instead of
+    imported up front. Looking an entry up with `[]` or `get()` imports it the first time, and
+    iterating over names never imports anything.
+
+    Entries can require an optional module. Every entry is listed either way; `available()` lists
+    the ones whose requirements can be imported, checking only when it's first called.
+    """
+
+    def __init__(self, package: str):
+        super().__init__()
+        self._package = package
+        self._requires = {}
+        self._available = None
+
+    def register(self, name: str, module: str, attribute: str, requires: str = None):
+        "Registers the class `attribute` of `module`, relative to this registry's package."
+        self[name] = (module, attribute)
+        if requires is not None:
+            self._requires[name] = requires
+        self._available = None
+
+    def available(self):
+        """
+        Lists the names of the entries that can be used, in the order they were registered. This
+        finds the modules they require without importing them.
+        """
+        if self._available is None:
+            found = {}
+            for requires in set(self._requires.values()):
+                found[requires] = find_spec(requires) is not None
+            self._available = [
+                name for name in self if name not in self._requires or found[self._requires[name]]
+            ]
+        return self._available
+
+    def __getitem__(self, name):
+        value = super().__getitem__(name)
+        if isinstance(value, tuple):
+            module, attribute = value
+            value = getattr(importlib.import_module(module, self._package), attribute)
+            self[name] = value
+        return value
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
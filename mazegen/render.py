@@ -0,0 +1,176 @@
+"""
+Image export for mazes too big to make sense of as text.
+
+Images are built one scanline at a time straight from rows of wall masks, so any grid-like object
+with `width`, `height` and `rows()` works (including a `MappedGrid`), and memory only depends on
+the width of the image. Supported formats are PBM, PGM and PNG; PNG is written with zlib and needs
+no other libraries.
+"""
+import os
+import struct
+import zlib
+from .grid import *
+
+__all__ = ("export", "scanlines", "write_pbm", "write_pgm", "write_png")
+
+BACKGROUND = 255
+WALL = 0
+PATH = 160
+
+NORTH, EAST, SOUTH, WEST = (w.value for w in Wall)
+_SOUTH_PIXEL = bytes(WALL if mask & SOUTH else BACKGROUND for mask in range(256))
+_NORTH_PIXEL = bytes(WALL if mask & NORTH else BACKGROUND for mask in range(256))
+_EAST_PIXEL = bytes(WALL if mask & EAST else BACKGROUND for mask in range(256))
+# A junction gets a post when any wall meets it
+_POST_PIXEL = bytes([BACKGROUND] + [WALL] * 255)
+# Pixels to the ASCII bits of a PBM row, where 1 is black
+_PBM_BITS = bytes(ord("1") if value < 128 else ord("0") for value in range(256))
+
+
+def _path_rows(path):
+    """
+    Groups a path of (X, Y) positions by row, as {y: {x: links}}, where links holds the EAST and
+    SOUTH bits of any step along the path to the neighboring cell in that direction.
+    """
+    rows = {}
+    previous = None
+    for x, y in path:
+        rows.setdefault(y, {}).setdefault(x, 0)
+        if previous is not None:
+            px, py = previous
+            if (px, py) == (x - 1, y) or (px, py) == (x + 1, y):
+                rows[y][min(px, x)] |= EAST
+            elif (px, py) == (x, y - 1) or (px, py) == (x, y + 1):
+                rows.setdefault(min(py, y), {}).setdefault(x, 0)
+                rows[min(py, y)][x] |= SOUTH
+        previous = (x, y)
+    return rows
+
+
+def _fill(line, start: int, size: int, value: int):
+    line[start : start + size] = bytes([value]) * size
+
+
+def scanlines(grid, cell: int = 4, wall: int = 1, path=None):
+    """
+    Yields the rows of pixels of a maze image as (grayscale bytes, repeat count) pairs, from top to
+    bottom. `path` is an optional sequence of (X, Y) positions to draw over the maze.
+    """
+    width = grid.width
+    period = cell + wall
+    size = width * period + wall
+    on_path = _path_rows(path or ())
+
+    def band(codes, between, links, link_bit):
+        """
+        Builds one band of pixel rows: `codes` fill the thin columns at the cell boundaries and
+        `between` fills the cells themselves. Path cells and links are then painted over it.
+        """
+        line = bytearray(size)
+        for k in range(wall):
+            line[k::period] = codes
+        for k in range(wall, period):
+            line[k::period] = between
+        for x, bits in links.items():
+            start = x * period + wall
+            if link_bit is None:
+                _fill(line, start, cell, PATH)
+                if bits & EAST:
+                    _fill(line, start + cell, wall, PATH)
+            elif bits & link_bit:
+                _fill(line, start, cell, PATH)
+        return bytes(line)
+
+    above = None
+    y = -1
+    for y, row in enumerate(grid.rows()):
+        row = bytes(row)
+        posts = junction_indices(width, above, row).translate(_POST_PIXEL)
+        if above is not None:
+            segments = above.translate(_SOUTH_PIXEL)
+        else:
+            segments = row.translate(_NORTH_PIXEL)
+        yield band(posts, segments, on_path.get(y - 1, {}), SOUTH), wall
+
+        verticals = bytes([WALL if row[0] & WEST else BACKGROUND]) + row.translate(_EAST_PIXEL)
+        yield band(verticals, bytes([BACKGROUND]) * width, on_path.get(y, {}), None), cell
+        above = row
+
+    if above is not None:
+        posts = junction_indices(width, above, None).translate(_POST_PIXEL)
+        yield band(posts, above.translate(_SOUTH_PIXEL), on_path.get(y, {}), SOUTH), wall
+
+
+def _image_size(grid, cell: int, wall: int):
+    return grid.width * (cell + wall) + wall, grid.height * (cell + wall) + wall
+
+
+def write_pgm(grid, out, cell: int = 4, wall: int = 1, path=None):
+    "Writes a maze as a binary grayscale PGM image to a binary file object."
+    out.write("P5\n{} {}\n255\n".format(*_image_size(grid, cell, wall)).encode("ascii"))
+    for line, repeat in scanlines(grid, cell, wall, path):
+        out.write(line * repeat)
+
+
+def write_pbm(grid, out, cell: int = 4, wall: int = 1, path=None):
+    """
+    Writes a maze as a binary black and white PBM image to a binary file object. A path, if given,
+    is drawn in white, since there's no gray to draw it in.
+    """
+    image_width, image_height = _image_size(grid, cell, wall)
+    out.write("P4\n{} {}\n".format(image_width, image_height).encode("ascii"))
+    padding = b"0" * (-image_width % 8)
+    packed_size = (image_width + 7) // 8
+    for line, repeat in scanlines(grid, cell, wall, path):
+        bits = int(line.translate(_PBM_BITS) + padding, 2)
+        out.write(bits.to_bytes(packed_size, "big") * repeat)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(data, zlib.crc32(kind))
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+
+def write_png(grid, out, cell: int = 4, wall: int = 1, path=None, level: int = 6):
+    "Writes a maze as an 8-bit grayscale PNG image to a binary file object."
+    image_width, image_height = _image_size(grid, cell, wall)
+    out.write(b"\x89PNG\r\n\x1a\n")
+    # 8-bit grayscale, no interlacing
+    header = struct.pack(">IIBBBBB", image_width, image_height, 8, 0, 0, 0, 0)
+    out.write(_png_chunk(b"IHDR", header))
+    compressor = zlib.compressobj(level)
+    pending = []
+    pending_size = 0
+    for line, repeat in scanlines(grid, cell, wall, path):
+        # Each scanline starts with its filter type; 0 is none.
+        data = compressor.compress((b"\0" + line) * repeat)
+        if data:
+            pending.append(data)
+            pending_size += len(data)
+        if pending_size >= 1 << 16:
+            out.write(_png_chunk(b"IDAT", b"".join(pending)))
+            pending = []
+            pending_size = 0
+    pending.append(compressor.flush())
+    out.write(_png_chunk(b"IDAT", b"".join(pending)))
+    out.write(_png_chunk(b"IEND", b""))
+
+
+WRITERS = {
+    ".pbm": write_pbm,
+    ".pgm": write_pgm,
+    ".png": write_png,
+}
+
+
+def export(grid, filename, cell: int = 4, wall: int = 1, path=None):
+    "Writes a maze image to a file, picking the format from its extension."
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(
+            "unknown image format `{}`, expected one of: {}".format(
+                extension, ", ".join(WRITERS)
+            )
+        )
+    with open(filename, "wb") as out:
+        WRITERS[extension](grid, out, cell, wall, path)
@@ -0,0 +1,87 @@
+"""
+Random number helpers.
+
+Generators and solvers each draw from their own `random.Random`, so that a maze only depends on
+its seed and not on whatever else is using random numbers at the same time. A maze's seed is
+derived from a base seed and the maze's index, and its generator and solver get independent
+streams derived from that.
+"""
+import random
+
+__all__ = ("BitStream", "BRAID", "GENERATE", "SOLVE", "default_rng", "derive_seed", "make_rng")
+
+# Keys for the streams of a single maze, for use with `make_rng`
+GENERATE = 0
+SOLVE = 1
+BRAID = 2
+
+
+def derive_seed(seed: int, *keys: int) -> int:
+    """
+    Derives an independent 64-bit seed from a base seed and any number of integer keys, e.g. the
+    index of a maze in a batch. The result only depends on the arguments, so it's the same in
+    every process and on every platform.
+    """
+    # hashlib takes a while to import, and starting up shouldn't wait on it
+    import hashlib
+
+    data = ",".join(str(part) for part in (seed,) + keys).encode("ascii")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def make_rng(seed: int, *keys: int) -> random.Random:
+    "Creates a random number generator seeded with `derive_seed(seed, *keys)`."
+    return random.Random(derive_seed(seed, *keys))
+
+
+def default_rng() -> random.Random:
+    """
+    Creates a random number generator for callers that didn't pass one. It's seeded from the
+    global `random` module, so that `random.seed` still makes those callers reproducible.
+    """
+    return random.Random(random.getrandbits(64))
+
+
+# For every 4-bit mask, the set bit picked by each 2-bit draw, or 0 to draw again. Masks with 1, 2
+# or 4 bits set use every draw; masks with 3 bits set reject one in four draws to stay uniform.
+_PICKS = tuple(
+    tuple(
+        bits[draw % len(bits)] if len(bits) != 3 or draw < 3 else 0 for draw in range(4)
+    )
+    if bits
+    else (0, 0, 0, 0)
+    for bits in (tuple(1 << bit for bit in range(4) if mask & (1 << bit)) for mask in range(16))
+)
+# Marks the top of the buffered bits, so that running out shows up as a small number
+_MARKER = 1 << 64
+
+
+class BitStream:
+    """
+    Hands out random bits a few at a time from 64-bit draws, which is much cheaper than calling
+    into the generator for every small choice.
+    """
+
+    __slots__ = ("_rng", "_bits")
+
+    def __init__(self, rng: random.Random):
+        self._rng = rng
+        self._bits = 1
+
+    def bit(self) -> int:
+        "Draws a single random bit."
+        bits = self._bits
+        if bits < 2:
+            bits = self._rng.getrandbits(64) | _MARKER
+        self._bits = bits >> 1
+        return bits & 1
+
+    def pick(self, mask: int) -> int:
+        "Picks one of the set bits of a nonzero 4-bit mask, like a wall mask, uniformly at random."
+        bits = self._bits
+        if bits < 4:
+            bits = self._rng.getrandbits(64) | _MARKER
+        self._bits = bits >> 2
+        choice = _PICKS[mask][bits & 3]
+        # Only masks with three bits set ever draw again, one time in four
+        return choice or self.pick(mask)
@@ -1,42 +1,185 @@
+import abc
 import random
-from typing import Optional
+from array import array
+from collections import deque
 from .grid import *
+from .rng import BitStream, default_rng
 
+__all__ = ("MazeSolver", "Solver", "BreadthFirst", "AStar", "Bidirectional", "SOLVERS")
 
-class Solver:
-    def __init__(self, grid: Grid):
-        self._grid = grid
-        self._backtrack = []
-        self._pos = (0, 0)
-        self._dir = None
-        self._backtracking = False
 
-        self._branches = {
-            self._pos: set(self.valid_cells().keys()),
-        }
+def _on_border(grid: Grid, x: int, y: int, wall: Wall) -> bool:
+    "Checks whether a cell's wall is part of the outer wall of the grid."
+    return (
+        (wall == Wall.NORTH and y == 0)
+        or (wall == Wall.SOUTH and y == grid.height - 1)
+        or (wall == Wall.WEST and x == 0)
+        or (wall == Wall.EAST and x == grid.width - 1)
+    )
+
+
+class MazeSolver(metaclass=abc.ABCMeta):
+    """
+    An abstract maze solver. Solvers start at an entrance and work their way to any one of the
+    exits one step at a time. By default there's one entrance, through the north wall of the
+    top-left corner, and one exit, through the east wall of the bottom-right corner.
+
+    Entrances and exits are given as (X, Y, wall) openings, whose walls must be on the outer edge
+    of the grid and are removed from it. The wall may be None for a cell that's an entrance or exit
+    without an opening. Solvers that walk start from the first entrance, and solvers that search
+    start from all of them at once.
+
+    Solvers that make random choices draw from their own random number generator, which is seeded
+    from the global `random` module unless one is given.
+    """
 
-        # Add entrance and exit
-        self.grid.cells[0][0].remove_wall(Wall.NORTH)
-        self.grid.cells[self.grid.height - 1][self.grid.width - 1].remove_wall(
-            Wall.EAST
+    def __init__(self, grid: Grid, rng: random.Random = None, entrances=None, exits=None):
+        self._grid = grid
+        self._rng = rng if rng is not None else default_rng()
+        self._entrances = list(entrances) if entrances else [(0, 0, Wall.NORTH)]
+        self._exits = (
+            list(exits) if exits else [(grid.width - 1, grid.height - 1, Wall.EAST)]
         )
+        self._pos = self.start
+        self._goals = {(x, y) for x, y, _ in self._exits}
+
+        # Add the entrances and exits, once they've all been checked
+        for x, y, _ in self._entrances + self._exits:
+            if not (0 <= x < grid.width and 0 <= y < grid.height):
+                raise ValueError("({}, {}) is outside of the maze".format(x, y))
+        openings = [opening for opening in self._entrances + self._exits if opening[2] is not None]
+        for x, y, wall in openings:
+            if not _on_border(grid, x, y, wall):
+                raise ValueError(
+                    "the {} wall of ({}, {}) isn't on the edge of the maze".format(
+                        Wall(wall).name.lower(), x, y
+                    )
+                )
+        for x, y, wall in openings:
+            grid.remove_wall(x, y, wall)
 
     @property
     def is_done(self) -> bool:
-        return self.goal == self.pos
+        return self.pos in self._goals
+
+    @property
+    def start(self):
+        "The cell of the first entrance, where walking solvers start."
+        return self._entrances[0][:2]
+
+    @property
+    def starts(self):
+        "The cells of every entrance."
+        return [(x, y) for x, y, _ in self._entrances]
 
     @property
     def goal(self):
-        return (self.grid.width - 1, self.grid.height - 1)
+        "The cell of the first exit."
+        return self._exits[0][:2]
+
+    @property
+    def goals(self):
+        "The cells of every exit."
+        return [(x, y) for x, y, _ in self._exits]
 
     @property
     def grid(self):
         return self._grid
 
+    @property
+    def rng(self) -> random.Random:
+        return self._rng
+
     @property
     def pos(self):
         return self._pos
 
+    @property
+    @abc.abstractmethod
+    def path(self):
+        "The current path from the entrance to this solver's position, as (X, Y) tuples."
+
+    @abc.abstractmethod
+    def step(self):
+        "Advances the solver by a single step."
+
+    def solve(self):
+        "Runs the solver until it's done, returning the path it found to the goal."
+        self.run_to_completion()
+        return self.path
+
+    def run_to_completion(self) -> int:
+        "Steps until the solver is done, returning the number of steps that took."
+        steps = 0
+        while not self.is_done:
+            self.step()
+            steps += 1
+        return steps
+
+
+# The wall bits set in each 4-bit mask
+_MASK_WALLS = tuple(tuple(w.value for w in Wall if mask & w.value) for mask in range(16))
+# Marks a cell's entry in Solver._branches as registered, on top of its remaining directions
+_REGISTERED = 0x10
+
+
+class Solver(MazeSolver):
+    """
+    A randomized depth-first solver that wanders the maze, backtracking out of dead ends.
+
+    This is a small state machine over flat cell indices. The open directions of every cell come
+    from the grid's adjacency index, so a step is a handful of integer operations and never
+    recurses.
+
+    Mazes with loops are handled by remembering every cell visited in a bitmap and treating moves
+    into them like walls, so each cell is entered going forward at most once and the backtrack
+    list never holds more than every cell.
+    """
+
+    def __init__(self, grid: Grid, rng: random.Random = None, entrances=None, exits=None):
+        super().__init__(grid, rng, entrances, exits)
+        adjacency = grid.adjacency()
+        self._passages = adjacency.open
+        self._deltas = adjacency.deltas
+        self._pick = BitStream(self.rng).pick
+        # The walls to rule out when arriving from a cell at each offset. In a grid one cell wide,
+        # north/west and east/south share offsets, but only one of each pair is ever open.
+        self._came_from = {}
+        for wall, delta in self._deltas.items():
+            self._came_from[delta] = self._came_from.get(delta, 0) | wall
+        # The trace move (see `mazegen.trace`) for a move by each offset. In a grid one cell wide,
+        # only north and south are possible, so they come last and win.
+        width = grid.width
+        self._delta_moves = {1: 1, -1: 3, -width: 0, width: 2}
+        self._index = grid.index(*self.start)
+        # Which cells are exits
+        self._is_goal = bytearray(len(self._passages))
+        for x, y in self.goals:
+            self._is_goal[grid.index(x, y)] = 1
+        # Which cells have been visited
+        self._visited = bytearray(len(self._passages))
+        self._visited[self._index] = 1
+        self._backtrack = []
+        self._dir = 0
+        self._backtracking = False
+        self.steps = 0
+        # A `Trace` that every move is recorded into, if any
+        self.trace = None
+
+        # For every cell, the directions not yet tried from it (or 0 if it isn't registered as a
+        # branch yet). The entrance is always a branch, with every direction open to it.
+        self._branches = bytearray(len(self._passages))
+        self._branches[self._index] = _REGISTERED | self._passages[self._index]
+
+    @property
+    def is_done(self) -> bool:
+        return self._is_goal[self._index] == 1
+
+    @property
+    def pos(self):
+        y, x = divmod(self._index, self.grid.width)
+        return (x, y)
+
     @property
     def cell(self):
         x, y = self.pos
@@ -46,79 +189,519 @@ class Solver:
     def backtracking(self) -> bool:
         return self._backtracking
 
+    @property
+    def path(self):
+        width = self.grid.width
+        return [(i % width, i // width) for i in self._backtrack] + [self.pos]
+
     def valid_cells(self):
         "Gets the cells that are available to move into."
         cell = self.cell
-        return {w: n for w, n in self.cell.neighbors().items() if w not in cell.walls}
+        mask = self._passages[self._index]
+        return {w: cell.neighbor(w) for w in Wall if mask & w.value}
 
     def move(self, wall: Wall):
-        assert wall in self.valid_cells()
-        x, y = self.pos
-        if wall == Wall.NORTH:
-            y -= 1
-        elif wall == Wall.SOUTH:
-            y += 1
-        elif wall == Wall.EAST:
-            x += 1
-        elif wall == Wall.WEST:
-            x -= 1
-        else:
-            assert False
+        assert self._passages[self._index] & wall.value
         # Add this motion to the backtrack list
-        self._backtrack.append(self.pos)
-        self._pos = (x, y)
+        self._backtrack.append(self._index)
+        delta = self._deltas[wall.value]
+        if self.trace is not None:
+            self.trace.append(self._delta_moves[delta])
+        self._index += delta
+        self._visited[self._index] = 1
 
     def step(self):
-        if self.is_done:
+        if self._is_goal[self._index]:
             return
+        self._advance()
+        self.steps += 1
+
+    def run_to_completion(self) -> int:
+        "Steps until the goal is reached, returning the number of steps that took."
+        advance, is_goal = self._advance, self._is_goal
+        steps = 0
+        while not is_goal[self._index]:
+            advance()
+            steps += 1
+        self.steps += steps
+        return steps
+
+    def _advance(self):
+        passages, branches, backtrack = self._passages, self._branches, self._backtrack
+        visited = self._visited
+        while True:
+            index = self._index
+            valid = passages[index]
+            branch = branches[index]
+            # Register this branch if there are multiple directions to go in, except for the one
+            # we just came from.
+            if not branch and len(_MASK_WALLS[valid]) > 1:
+                branch = _REGISTERED | valid
+                if backtrack:
+                    branch &= ~self._came_from[backtrack[-1] - index]
+                branches[index] = branch
 
-        valid_cells = self.valid_cells()
-        # Register this branch if there are multiple targets to go to
-        if len(valid_cells) > 1 and self.pos not in self._branches:
-            self._branches[self.pos] = set(valid_cells.keys())
-            # Also, if we have backtrack positions available, disable the cell that we just came
-            # from.
-            if self._backtrack:
-                x1, y1 = self.pos
-                x2, y2 = self._backtrack[-1]
-                diff = (x2 - x1, y2 - y1)
-                if diff == (-1, 0):
-                    wall = Wall.WEST
-                elif diff == (1, 0):
-                    wall = Wall.EAST
-                elif diff == (0, -1):
-                    wall = Wall.NORTH
-                elif diff == (0, 1):
-                    wall = Wall.SOUTH
-                else:
-                    assert False
-                self._branches[self.pos].remove(wall)
-
-        if self.pos in self._branches and self._branches[self.pos]:
-            # Choose a direction to move if we're at a branch
-            self._backtracking = False
-            self._dir = random.choice(list(self._branches[self.pos]))
-            self._branches[self.pos].remove(self._dir)
-
-        if self.backtracking:
-            # Set up for backtracking, but there's no backtrack left.
-            if not self._backtrack:
+            remaining = branch & ~_REGISTERED
+            if remaining:
+                # Choose a direction to move if we're at a branch
                 self._backtracking = False
-                self.step()
+                self._dir = self._pick(remaining)
+                branches[index] = branch & ~self._dir
+
+            if self._backtracking:
+                if backtrack:
+                    previous = backtrack.pop()
+                    if self.trace is not None:
+                        self.trace.append(self._delta_moves[previous - index])
+                    self._index = previous
+                    return
+                # There's no backtrack left, so start over from here going forward.
+                self._backtracking = False
+            elif self._dir & valid:
+                delta = self._deltas[self._dir]
+                target = index + delta
+                if visited[target]:
+                    # A loop back to somewhere already explored, which is as good as a wall.
+                    # Try another direction from here, or else backtrack.
+                    if not branches[index] & ~_REGISTERED:
+                        if not backtrack:
+                            raise ValueError("there is no path from the entrance to the goal")
+                        self._backtracking = True
+                    continue
+                visited[target] = 1
+                backtrack.append(index)
+                if self.trace is not None:
+                    self.trace.append(self._delta_moves[delta])
+                self._index = target
+                return
             else:
-                self._pos = self._backtrack.pop()
-        else:
-            if self._dir not in valid_cells:
-                # Can't move this direction, try these options in this order:
-                # * Choose a random direction on this branch if we are on a branch,
-                # * Start backtracking
-                if self.pos in self._branches and self._branches[self.pos]:
-                    self._dir = random.choice(list(self._branches[self.pos]))
-                    self._branches[self.pos].remove(self._dir)
-                else:
-                    self._backtracking = True
-                    # TODO : prevent stack overflow where we have no backtrack available
-                    assert self._backtrack
-                    self.step()
+                # Can't move in this direction and there's nowhere else left to try here.
+                if not backtrack:
+                    raise ValueError("there is no path from the entrance to the goal")
+                self._backtracking = True
+
+
+class _SearchSolver(MazeSolver):
+    """
+    A base for solvers that search the grid's adjacency index by flat cell index. Each step
+    expands one cell, which becomes the solver's position, and the search ends by yielding the
+    goal.
+    """
+
+    def __init__(self, grid: Grid, rng: random.Random = None, entrances=None, exits=None):
+        super().__init__(grid, rng, entrances, exits)
+        adjacency = grid.adjacency()
+        self._passages = adjacency.open
+        self._moves = adjacency.moves
+        self._starts = [grid.index(x, y) for x, y in self.starts]
+        self._goal_indices = [grid.index(x, y) for x, y in self.goals]
+        # Which cells are exits
+        self._is_goal = bytearray(len(self._passages))
+        for index in self._goal_indices:
+            self._is_goal[index] = 1
+        self._index = self._starts[0]
+        self._search = None
+
+    @property
+    def is_done(self) -> bool:
+        return self._is_goal[self._index] == 1
+
+    def _new_roots(self, indices):
+        "Creates an array of parent indices for a search starting from every one of `indices`."
+        parents = self._new_parents()
+        for index in indices:
+            parents[index] = index
+        return parents
+
+    def _new_parents(self):
+        "Creates an array of each cell's parent index, with -1 marking unvisited cells."
+        return array("l", [-1]) * len(self._passages)
+
+    def _chain(self, parents, index):
+        "Follows parent indices from the given cell back to the root of the search."
+        chain = [index]
+        while parents[index] != index:
+            index = parents[index]
+            chain.append(index)
+        return chain
+
+    def _to_pos(self, index):
+        y, x = divmod(index, self.grid.width)
+        return (x, y)
+
+    @abc.abstractmethod
+    def _expand(self):
+        "A generator that yields the index of each cell as it's expanded, ending with a goal."
+
+    def _run(self):
+        """
+        Runs the whole search in one go, returning the goal it ends on, or None if there's no path.
+        Subclasses override this with a loop that doesn't stop after every cell, for `solve()`.
+        """
+        index = None
+        for index in self._expand():
+            pass
+        return index if index is not None and self._is_goal[index] else None
+
+    def _searching(self):
+        if self._search is None:
+            self._search = self._expand()
+        return self._search
+
+    def step(self):
+        if self.is_done:
+            return
+        index = next(self._searching(), None)
+        if index is None:
+            raise ValueError("there is no path from the entrance to the goal")
+        self._index = index
+        self._pos = self._to_pos(index)
+
+    def solve(self):
+        if not self.is_done:
+            if self._search is None:
+                # Nothing's been stepped through yet, so the search can run without stopping
+                index = self._run()
+                self._search = iter(())
+            else:
+                index = None
+                for index in self._search:
+                    pass
+            if index is not None:
+                self._index = index
+                self._pos = self._to_pos(index)
+            if not self.is_done:
+                raise ValueError("there is no path from the entrance to the goal")
+        return self.path
+
+
+class BreadthFirst(_SearchSolver):
+    """
+    A breadth-first solver. It finds the shortest path, expanding cells in order of distance from
+    the nearest entrance, and stops at whichever exit it reaches first.
+    """
+
+    def __init__(self, grid: Grid, rng: random.Random = None, entrances=None, exits=None):
+        super().__init__(grid, rng, entrances, exits)
+        self._parents = self._new_roots(self._starts)
+
+    @property
+    def path(self):
+        return [self._to_pos(index) for index in reversed(self._chain(self._parents, self._index))]
+
+    def _expand(self):
+        passages, moves, is_goal = self._passages, self._moves, self._is_goal
+        parents = self._parents
+        queue = deque(self._starts)
+        while queue:
+            index = queue.popleft()
+            yield index
+            if is_goal[index]:
+                return
+            for delta in moves[passages[index]]:
+                other = index + delta
+                if parents[other] < 0:
+                    parents[other] = index
+                    queue.append(other)
+
+    def _run(self):
+        passages, moves, is_goal = self._passages, self._moves, self._is_goal
+        parents = self._parents
+        for index in self._starts:
+            if is_goal[index]:
+                return index
+        # A level at a time, which finds cells in the same order as the queue, and stopping as
+        # soon as an exit is found rather than when it comes out of the queue
+        level = self._starts
+        while level:
+            following = []
+            append = following.append
+            for index in level:
+                for delta in moves[passages[index]]:
+                    other = index + delta
+                    if parents[other] < 0:
+                        parents[other] = index
+                        if is_goal[other]:
+                            return other
+                        append(other)
+            level = following
+        return None
+
+
+class AStar(_SearchSolver):
+    """
+    An A* solver using the Manhattan distance to the nearest exit as its heuristic. It finds the
+    shortest path, heading straight for an exit wherever the maze allows it.
+    """
+
+    def __init__(self, grid: Grid, rng: random.Random = None, entrances=None, exits=None):
+        super().__init__(grid, rng, entrances, exits)
+        self._parents = self._new_roots(self._starts)
+
+    @property
+    def path(self):
+        return [self._to_pos(index) for index in reversed(self._chain(self._parents, self._index))]
+
+    def _new_costs(self):
+        """
+        Creates an array of the cost of the best path found to each cell. Unvisited cells cost more
+        than any path could, and a closed cell never costs more than a step past a neighbor, so
+        one comparison tells whether a cell is worth pushing.
+        """
+        return array("l", [len(self._passages)]) * len(self._passages)
+
+    def _heuristic(self, index):
+        y, x = divmod(index, self.grid.width)
+        return min(abs(gx - x) + abs(gy - y) for gx, gy in self.goals)
+
+    def _toward(self) -> bytes:
+        """
+        Makes the mask of directions out of each cell that lead closer to the only exit. Every move
+        costs one, so a move that way keeps a cell's estimate the same and any other move adds two,
+        without working out where either cell is.
+        """
+        (goal_x, goal_y), = self.goals
+        width, height = self.grid.width, self.grid.height
+        row = (
+            bytes([Wall.EAST.value]) * goal_x
+            + b"\0"
+            + bytes([Wall.WEST.value]) * (width - goal_x - 1)
+        )
+        above = row.translate(bytes(mask | Wall.SOUTH.value for mask in range(256)))
+        below = row.translate(bytes(mask | Wall.NORTH.value for mask in range(256)))
+        return above * goal_y + row + below * (height - goal_y - 1)
+
+    def _expand(self):
+        passages, moves, is_goal = self._passages, self._moves, self._is_goal
+        parents = self._parents
+        costs = self._new_costs()
+        closed = bytearray(len(passages))
+        # Every step costs the same and the heuristic is consistent, so estimates never go down
+        # and a bucket per estimate stands in for a priority queue. Buckets are stacks, so that
+        # ties go to the most recently found (deepest) cell.
+        buckets = {}
+        for start in self._starts:
+            costs[start] = 0
+            buckets.setdefault(self._heuristic(start), []).append(start)
+        if len(self.goals) > 1:
+            heuristic = self._heuristic
+            while buckets:
+                estimate = min(buckets)
+                bucket = buckets[estimate]
+                index = bucket.pop()
+                if not bucket:
+                    del buckets[estimate]
+                if closed[index]:
+                    continue
+                closed[index] = 1
+                yield index
+                if is_goal[index]:
+                    return
+                cost = costs[index] + 1
+                for delta in moves[passages[index]]:
+                    other = index + delta
+                    if costs[other] <= cost:
+                        continue
+                    costs[other] = cost
+                    parents[other] = index
+                    buckets.setdefault(cost + heuristic(other), []).append(other)
+            return
+        toward = self._toward()
+        while buckets:
+            estimate = min(buckets)
+            bucket = buckets.pop(estimate)
+            later = buckets.setdefault(estimate + 2, [])
+            while bucket:
+                index = bucket.pop()
+                if closed[index]:
+                    continue
+                closed[index] = 1
+                yield index
+                if is_goal[index]:
                     return
-            self.move(self._dir)
+                cost = costs[index] + 1
+                mask = passages[index]
+                closer = mask & toward[index]
+                for delta in moves[closer]:
+                    other = index + delta
+                    if costs[other] > cost:
+                        costs[other] = cost
+                        parents[other] = index
+                        bucket.append(other)
+                for delta in moves[mask ^ closer]:
+                    other = index + delta
+                    if costs[other] > cost:
+                        costs[other] = cost
+                        parents[other] = index
+                        later.append(other)
+            if not later:
+                del buckets[estimate + 2]
+
+    def _run(self):
+        if len(self.goals) > 1:
+            return super()._run()
+        # The same search as `_expand`, with one exit
+        passages, moves, is_goal = self._passages, self._moves, self._is_goal
+        parents = self._parents
+        costs = self._new_costs()
+        closed = bytearray(len(passages))
+        toward = self._toward()
+        buckets = {}
+        for start in self._starts:
+            costs[start] = 0
+            buckets.setdefault(self._heuristic(start), []).append(start)
+        while buckets:
+            estimate = min(buckets)
+            bucket = buckets.pop(estimate)
+            later = buckets.setdefault(estimate + 2, [])
+            pop, push, push_later = bucket.pop, bucket.append, later.append
+            while bucket:
+                index = pop()
+                if closed[index]:
+                    continue
+                closed[index] = 1
+                if is_goal[index]:
+                    return index
+                cost = costs[index] + 1
+                mask = passages[index]
+                closer = mask & toward[index]
+                for delta in moves[closer]:
+                    other = index + delta
+                    if costs[other] > cost:
+                        costs[other] = cost
+                        parents[other] = index
+                        push(other)
+                for delta in moves[mask ^ closer]:
+                    other = index + delta
+                    if costs[other] > cost:
+                        costs[other] = cost
+                        parents[other] = index
+                        push_later(other)
+            if not later:
+                del buckets[estimate + 2]
+        return None
+
+
+class Bidirectional(_SearchSolver):
+    """
+    A bidirectional breadth-first solver. Searches from the entrances and the exits take turns
+    expanding a level of cells until they meet, which finds the shortest path while visiting fewer
+    cells.
+    """
+
+    def __init__(self, grid: Grid, rng: random.Random = None, entrances=None, exits=None):
+        super().__init__(grid, rng, entrances, exits)
+        self._forward = self._new_roots(self._starts)
+        self._backward = self._new_roots(self._goal_indices)
+        # Where the two searches met, once they have
+        self._meet = next((i for i in self._starts if self._is_goal[i]), None)
+
+    @property
+    def is_done(self) -> bool:
+        # The backward search starts out sitting on the goal, so that alone doesn't mean much.
+        return self._meet is not None
+
+    @property
+    def path(self):
+        index = self._index if self._meet is None else self._meet
+        if self._forward[index] < 0:
+            # Partway through a step of the backward search
+            return [self._to_pos(i) for i in self._chain(self._backward, index)]
+        path = [self._to_pos(i) for i in reversed(self._chain(self._forward, index))]
+        if self._meet is not None:
+            path += [self._to_pos(i) for i in self._chain(self._backward, index)[1:]]
+        return path
+
+    def _new_searches(self):
+        """
+        Sets up the forward and backward searches, each as its current level of cells, its parent
+        indices, the other's parent indices, its distances and the other's distances.
+        """
+        forward, backward = self._forward, self._backward
+        # How far each cell is from the nearest entrance or exit, by the search that reached it
+        distances = (self._new_parents(), self._new_parents())
+        for index in self._starts:
+            distances[0][index] = 0
+        for index in self._goal_indices:
+            distances[1][index] = 0
+        return (
+            [list(self._starts), forward, backward, distances[0], distances[1]],
+            [list(self._goal_indices), backward, forward, distances[1], distances[0]],
+        )
+
+    def _expand(self):
+        passages, moves = self._passages, self._moves
+        searches = self._new_searches()
+        # The length of the shortest path found so far, in moves, and where it met
+        best = meet = None
+        depths = [0, 0]
+        side = 0
+        # With several entrances and exits, the first place the searches meet isn't necessarily
+        # on the shortest path. Each search finishes the level it's on, and they keep going until
+        # no path they haven't seen yet could be shorter than the best one they have.
+        while best is None or best > depths[0] + depths[1] + 1:
+            level, parents, others, distance, other_distance = searches[side]
+            if not level:
+                break
+            depth = depths[side] + 1
+            following = []
+            for index in level:
+                yield index
+                for delta in moves[passages[index]]:
+                    other = index + delta
+                    if parents[other] < 0:
+                        parents[other] = index
+                        distance[other] = depth
+                        following.append(other)
+                    if others[other] >= 0:
+                        length = distance[other] + other_distance[other]
+                        if best is None or length < best:
+                            best, meet = length, other
+            searches[side][0] = following
+            depths[side] = depth
+            side ^= 1
+        if meet is not None:
+            self._meet = meet
+            # End on the exit that the backward search reached the meeting point from
+            yield self._chain(self._backward, meet)[-1]
+
+    def _run(self):
+        # The same search as `_expand`
+        passages, moves = self._passages, self._moves
+        searches = self._new_searches()
+        best = meet = None
+        depths = [0, 0]
+        side = 0
+        while best is None or best > depths[0] + depths[1] + 1:
+            level, parents, others, distance, other_distance = searches[side]
+            if not level:
+                break
+            depth = depths[side] + 1
+            following = []
+            append = following.append
+            for index in level:
+                for delta in moves[passages[index]]:
+                    other = index + delta
+                    if parents[other] < 0:
+                        parents[other] = index
+                        distance[other] = depth
+                        append(other)
+                    if others[other] >= 0:
+                        length = distance[other] + other_distance[other]
+                        if best is None or length < best:
+                            best, meet = length, other
+            searches[side][0] = following
+            depths[side] = depth
+            side ^= 1
+        if meet is None:
+            return None
+        self._meet = meet
+        return self._chain(self._backward, meet)[-1]
+
+
+SOLVERS = {
+    "random": Solver,
+    "bfs": BreadthFirst,
+    "astar": AStar,
+    "bidirectional": Bidirectional,
+}
@@ -0,0 +1,245 @@
+"""
+A compact binary file format for grids.
+
+Files start with a fixed header followed by the name of the generating algorithm:
+
+    magic      4 bytes   b"MAZE"
+    version    u8        1
+    flags      u8        bit 0 is set when the seed is known
+    name size  u16       length of the algorithm name in bytes
+    width      u32
+    height     u32
+    seed       u64
+    algorithm  UTF-8     the algorithm name, possibly empty
+
+After that come 2 bits per cell in row-major order, four cells per byte starting from the low
+bits, with bit 0 set for an east wall and bit 1 for a south wall. North and west walls are the
+south and east walls of the neighboring cells, except along the outer border, which is stored last
+as one bit per cell for the top row (north walls) and then the left column (west walls).
+
+All integers are little-endian.
+"""
+import mmap
+import struct
+from .grid import *
+from .grid import or_bytes
+
+__all__ = (
+    "MappedGrid",
+    "load",
+    "pack_codes",
+    "read_grid",
+    "save",
+    "unpack_codes",
+    "write_grid",
+)
+
+MAGIC = b"MAZE"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHIIQ")
+FLAG_SEED = 1
+
+NORTH, EAST, SOUTH, WEST = (w.value for w in Wall)
+# Cell wall masks to 2-bit codes and back
+_TO_CODE = bytes((1 if mask & EAST else 0) | (2 if mask & SOUTH else 0) for mask in range(256))
+_FROM_CODE = bytes((EAST if code & 1 else 0) | (SOUTH if code & 2 else 0) for code in range(256))
+# Codes moved into the bits of their neighbor's walls: east -> west, south -> north
+_TO_WEST = bytes(WEST if code & 1 else 0 for code in range(256))
+_TO_NORTH = bytes(NORTH if code & 2 else 0 for code in range(256))
+# Shifting values within a byte, and pulling 2-bit fields back out of packed bytes
+_SHIFT = [bytes((value << shift) & 0xFF for value in range(256)) for shift in range(8)]
+_FIELD = [bytes((value >> (i * 2)) & 3 for value in range(256)) for i in range(4)]
+
+
+def pack_codes(codes: bytes) -> bytes:
+    "Packs 2-bit codes, one per byte, into four per byte."
+    codes = codes + bytes(-len(codes) % 4)
+    pairs = or_bytes(codes[0::2], codes[1::2].translate(_SHIFT[2]))
+    return or_bytes(pairs[0::2], pairs[1::2].translate(_SHIFT[4]))
+
+
+def unpack_codes(packed: bytes, count: int) -> bytearray:
+    "Unpacks `count` 2-bit codes from four per byte to one per byte."
+    codes = bytearray(len(packed) * 4)
+    for i in range(4):
+        codes[i::4] = packed.translate(_FIELD[i])
+    del codes[count:]
+    return codes
+
+
+def _pack_bits(bits) -> bytes:
+    "Packs an iterable of booleans into bytes, eight per byte starting from the low bit."
+    packed = bytearray()
+    for i, bit in enumerate(bits):
+        if i % 8 == 0:
+            packed.append(0)
+        if bit:
+            packed[-1] |= 1 << (i % 8)
+    return bytes(packed)
+
+
+def _bit(data, offset: int, index: int) -> bool:
+    return bool(data[offset + index // 8] & (1 << (index % 8)))
+
+
+def _layout(width: int, height: int, name_size: int):
+    "Gets the offsets of the cells, north border and west border, and the total file size."
+    cells = HEADER.size + name_size
+    north = cells + (width * height + 3) // 4
+    west = north + (width + 7) // 8
+    return cells, north, west, west + (height + 7) // 8
+
+
+def save(grid: Grid, path, algorithm: str = None, seed: int = None):
+    "Writes a grid to a file, along with the algorithm and seed that made it (if known)."
+    with open(path, "wb") as f:
+        write_grid(grid, f, algorithm, seed)
+
+
+def write_grid(grid: Grid, f, algorithm: str = None, seed: int = None):
+    "Writes a grid to an open binary file."
+    width, height = grid.width, grid.height
+    walls = bytes(grid.walls)
+    name = (algorithm or "").encode("utf-8")
+    flags = FLAG_SEED if seed is not None else 0
+    f.write(HEADER.pack(MAGIC, VERSION, flags, len(name), width, height, seed or 0))
+    f.write(name)
+    f.write(pack_codes(walls.translate(_TO_CODE)))
+    f.write(_pack_bits(walls[x] & NORTH for x in range(width)))
+    f.write(_pack_bits(walls[y * width] & WEST for y in range(height)))
+
+
+def _read_header(data):
+    magic, version, flags, name_size, width, height, seed = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a maze file")
+    if version != VERSION:
+        raise ValueError("unsupported maze file version {}".format(version))
+    name = bytes(data[HEADER.size : HEADER.size + name_size]).decode("utf-8")
+    if len(data) < _layout(width, height, name_size)[3]:
+        raise ValueError("truncated maze file")
+    return width, height, name or None, seed if flags & FLAG_SEED else None, name_size
+
+
+def load(path) -> Grid:
+    "Reads a grid back from a file."
+    with open(path, "rb") as f:
+        data = f.read()
+    return read_grid(data)[0]
+
+
+def read_grid(data):
+    """
+    Reads a grid from the start of some bytes, returning it along with the number of bytes it
+    took up.
+    """
+    width, height, _, _, name_size = _read_header(data)
+    cells, north, west, end = _layout(width, height, name_size)
+    size = width * height
+    codes = bytes(unpack_codes(data[cells:north], size))
+
+    # Each cell's own east/south walls, plus the west wall from the cell before it and the north
+    # wall from the cell above it. The border cells get fixed up afterwards.
+    walls = bytearray(
+        or_bytes(
+            codes.translate(_FROM_CODE),
+            bytes(1) + codes[:-1].translate(_TO_WEST),
+            bytes(width) + codes[: size - width].translate(_TO_NORTH),
+        )
+    )
+    for x in range(width):
+        walls[x] = (walls[x] & ~NORTH) | (NORTH if _bit(data, north, x) else 0)
+    for y in range(height):
+        index = y * width
+        walls[index] = (walls[index] & ~WEST) | (WEST if _bit(data, west, y) else 0)
+    return Grid.from_walls(width, height, walls), end
+
+
+class MappedGrid:
+    """
+    A read-only grid backed by a memory-mapped maze file. Walls are decoded from the file on
+    demand, so huge mazes can be queried without loading them.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._width, self._height, self.algorithm, self.seed, name_size = _read_header(self._map)
+        self._cells, self._north, self._west, _ = _layout(self._width, self._height, name_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    def _code(self, index: int) -> int:
+        return (self._map[self._cells + index // 4] >> ((index % 4) * 2)) & 3
+
+    def walls_at(self, x: int, y: int) -> int:
+        "Gets the wall mask of the cell at the given position."
+        if not (0 <= x < self._width and 0 <= y < self._height):
+            raise IndexError((x, y))
+        index = y * self._width + x
+        mask = _FROM_CODE[self._code(index)]
+        if x == 0:
+            mask |= WEST if _bit(self._map, self._west, y) else 0
+        elif self._code(index - 1) & 1:
+            mask |= WEST
+        if y == 0:
+            mask |= NORTH if _bit(self._map, self._north, x) else 0
+        elif self._code(index - self._width) & 2:
+            mask |= NORTH
+        return mask
+
+    def has_wall(self, x: int, y: int, wall: Wall) -> bool:
+        return bool(self.walls_at(x, y) & wall.value)
+
+    def _row_codes(self, y: int) -> bytes:
+        "Decodes the 2-bit codes of a row of cells, from the bytes the row is packed into."
+        width = self._width
+        start = y * width
+        skip = start % 4
+        packed = self._map[self._cells + start // 4 : self._cells + (start + width + 3) // 4]
+        return bytes(unpack_codes(packed, skip + width)[skip:])
+
+    def rows(self):
+        """
+        Yields the wall masks of each row of cells, top to bottom, decoding one row at a time the
+        same way a whole file is loaded.
+        """
+        width = self._width
+        above = None
+        for y in range(self._height):
+            codes = self._row_codes(y)
+            row = bytearray(
+                or_bytes(
+                    codes.translate(_FROM_CODE),
+                    bytes(1) + codes[:-1].translate(_TO_WEST),
+                    above.translate(_TO_NORTH) if above is not None else bytes(width),
+                )
+            )
+            if y == 0:
+                for x in range(width):
+                    row[x] |= NORTH if _bit(self._map, self._north, x) else 0
+            row[0] |= WEST if _bit(self._map, self._west, y) else 0
+            yield bytes(row)
+            above = codes
+
+    def to_grid(self) -> Grid:
+        "Loads the whole maze into a regular grid."
+        grid = Grid(self._width, self._height)
+        for y, row in enumerate(self.rows()):
+            grid.walls[y * self._width : (y + 1) * self._width] = row
+        return grid
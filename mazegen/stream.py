@@ -0,0 +1,31 @@
+"""
+Streaming maze output. Rows are generated, rendered and written one at a time, so peak memory only
+depends on the width of the maze.
+"""
+import random
+import sys
+from .grid import *
+from .maze import Eller
+
+__all__ = ("stream_maze",)
+
+
+def _open_ends(rows, width: int, height: int):
+    "Opens the entrance and exit in the first and last rows, the same as the solver does."
+    for y, row in enumerate(rows):
+        if y == 0 or y == height - 1:
+            row = bytearray(row)
+            if y == 0:
+                row[0] &= ~Wall.NORTH.value
+            if y == height - 1:
+                row[width - 1] &= ~Wall.EAST.value
+        yield row
+
+
+def stream_maze(width: int, height: int, out=None, rng: random.Random = None):
+    "Generates a maze with Eller's algorithm, writing it to `out` (STDOUT by default) as it goes."
+    out = out or sys.stdout
+    rows = _open_ends(Eller.rows(width, height, rng), width, height)
+    for line in render_rows(width, rows):
+        out.write(line)
+        out.write("\n")
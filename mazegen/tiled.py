@@ -0,0 +1,366 @@
+"""
+Tiled grids, for mazes far bigger than memory.
+
+A tiled grid is split into square tiles that are generated on demand, each from its own seed, and
+only the most recently used tiles are kept. Every tile is a perfect maze on its own, and each tile
+other than the first joins exactly one earlier tile through a single opening in the seam between
+them: the tile above or the tile to the left, picked at random like a binary tree maze. The tiles
+form a spanning tree, so the whole grid is a perfect maze, and where a tile joins its neighbor is
+known without generating that neighbor.
+"""
+import random
+from collections import OrderedDict
+from .grid import *
+from .grid import ALL_WALLS
+from .maze import GENERATORS
+from .rng import BitStream, make_rng
+from .solver import MazeSolver
+
+__all__ = ("TiledGrid", "TiledSolver", "Viewport")
+
+NORTH, EAST, SOUTH, WEST = (w.value for w in Wall)
+# The (X, Y) offset of a move through each wall bit
+_OFFSETS = {NORTH: (0, -1), EAST: (1, 0), SOUTH: (0, 1), WEST: (-1, 0)}
+_OPPOSITES = {NORTH: SOUTH, EAST: WEST, SOUTH: NORTH, WEST: EAST}
+_WALLS = {offset: bit for bit, offset in _OFFSETS.items()}
+# Keys for the random streams of each tile
+_CARVE = 0
+_LINK = 1
+
+
+class TiledGrid:
+    """
+    A grid made of tiles generated on demand with the given algorithm. Tiles are `tile_size` cells
+    square (except along the right and bottom edges) and at most `cache_size` of them are kept in
+    memory at once, so memory use doesn't depend on the size of the grid.
+
+    Walls added or removed through the grid are remembered separately and applied again whenever
+    a tile is regenerated, so they should be kept few, like an entrance and an exit.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        seed: int,
+        algorithm: str = "depth-first",
+        tile_size: int = 64,
+        cache_size: int = 64,
+    ):
+        self._width = width
+        self._height = height
+        self._seed = seed
+        self._generator = GENERATORS[algorithm]
+        self._tile_size = tile_size
+        self._cache_size = max(1, cache_size)
+        self._tiles = OrderedDict()
+        # The wall masks of cells changed through the grid, by position
+        self._edits = {}
+        self.generated = 0
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    @property
+    def tile_size(self) -> int:
+        return self._tile_size
+
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    @property
+    def loaded(self) -> int:
+        "The number of tiles currently in memory."
+        return len(self._tiles)
+
+    def _tile_width(self, tx: int) -> int:
+        return min(self._tile_size, self._width - tx * self._tile_size)
+
+    def _tile_height(self, ty: int) -> int:
+        return min(self._tile_size, self._height - ty * self._tile_size)
+
+    def link(self, tx: int, ty: int):
+        """
+        Gets where the tile at the given tile position joins the tile it hangs off of, as
+        (NORTH or WEST wall bit, offset along the seam), or None for the first tile.
+        """
+        if tx == 0 and ty == 0:
+            return None
+        rng = make_rng(self._seed, tx, ty, _LINK)
+        if ty == 0:
+            up = False
+        elif tx == 0:
+            up = True
+        else:
+            up = rng.getrandbits(1)
+        if up:
+            return NORTH, rng.randrange(self._tile_width(tx))
+        return WEST, rng.randrange(self._tile_height(ty))
+
+    def tile(self, tx: int, ty: int) -> Grid:
+        "Gets the tile at the given tile position, generating it if it isn't in memory."
+        key = (tx, ty)
+        tiles = self._tiles
+        tile = tiles.get(key)
+        if tile is not None:
+            tiles.move_to_end(key)
+            return tile
+        tile = self._generate(tx, ty)
+        tiles[key] = tile
+        if len(tiles) > self._cache_size:
+            tiles.popitem(last=False)
+        return tile
+
+    def _generate(self, tx: int, ty: int) -> Grid:
+        width, height = self._tile_width(tx), self._tile_height(ty)
+        tile = Grid(width, height)
+        self._generator(tile, make_rng(self._seed, tx, ty, _CARVE)).generate()
+        walls = tile.walls
+        # Open this tile's own link, and the links of the tiles below and to the right that hang
+        # off of this one.
+        link = self.link(tx, ty)
+        if link is not None:
+            wall, offset = link
+            if wall == NORTH:
+                walls[offset] &= ~NORTH
+            else:
+                walls[offset * width] &= ~WEST
+        if (ty + 1) * self._tile_size < self._height:
+            below = self.link(tx, ty + 1)
+            if below[0] == NORTH:
+                walls[(height - 1) * width + below[1]] &= ~SOUTH
+        if (tx + 1) * self._tile_size < self._width:
+            right = self.link(tx + 1, ty)
+            if right[0] == WEST:
+                walls[right[1] * width + width - 1] &= ~EAST
+        # Reapply any edits that fall in this tile
+        size = self._tile_size
+        for (x, y), mask in self._edits.items():
+            if x // size == tx and y // size == ty:
+                walls[(y - ty * size) * width + x - tx * size] = mask
+        self.generated += 1
+        return tile
+
+    def walls_at(self, x: int, y: int) -> int:
+        "Gets the wall mask of the cell at the given position."
+        size = self._tile_size
+        tx, ty = x // size, y // size
+        tile = self.tile(tx, ty)
+        return tile.walls[(y - ty * size) * tile.width + x - tx * size]
+
+    def has_wall(self, x: int, y: int, wall: Wall) -> bool:
+        return bool(self.walls_at(x, y) & wall.value)
+
+    def open_at(self, x: int, y: int) -> int:
+        "Gets the mask of directions out of a cell that lead into another cell."
+        mask = ~self.walls_at(x, y) & ALL_WALLS
+        if y == 0:
+            mask &= ~NORTH
+        if x == self._width - 1:
+            mask &= ~EAST
+        if y == self._height - 1:
+            mask &= ~SOUTH
+        if x == 0:
+            mask &= ~WEST
+        return mask
+
+    def _set_walls(self, x: int, y: int, mask: int):
+        self._edits[(x, y)] = mask
+        size = self._tile_size
+        tile = self._tiles.get((x // size, y // size))
+        if tile is not None:
+            tile.walls[(y - y // size * size) * tile.width + x - x // size * size] = mask
+
+    def _change_wall(self, x: int, y: int, wall: Wall, present: bool):
+        bit = wall.value
+        cells = [(x, y, bit)]
+        dx, dy = _OFFSETS[bit]
+        if 0 <= x + dx < self._width and 0 <= y + dy < self._height:
+            cells.append((x + dx, y + dy, _OPPOSITES[bit]))
+        for cx, cy, cbit in cells:
+            mask = self.walls_at(cx, cy)
+            self._set_walls(cx, cy, mask | cbit if present else mask & ~cbit)
+
+    def add_wall(self, x: int, y: int, wall: Wall):
+        self._change_wall(x, y, wall, True)
+
+    def remove_wall(self, x: int, y: int, wall: Wall):
+        self._change_wall(x, y, wall, False)
+
+    def row(self, y: int, x: int, width: int) -> bytes:
+        "Gets the wall masks of `width` cells of a row, starting from the given column."
+        size = self._tile_size
+        ty = y // size
+        parts = []
+        end = min(x + width, self._width)
+        while x < end:
+            tx = x // size
+            tile = self.tile(tx, ty)
+            start = (y - ty * size) * tile.width
+            stop = min(end, (tx + 1) * size)
+            parts.append(tile.walls[start + x - tx * size : start + stop - tx * size])
+            x = stop
+        return b"".join(parts)
+
+
+class TiledSolver(MazeSolver):
+    """
+    A randomized depth-first solver for tiled grids, working the same way as `Solver` but keeping
+    its state by position in dicts, since a tiled grid is too big for flat arrays. Its memory only
+    grows with the part of the maze it has explored.
+    """
+
+    def __init__(self, grid: TiledGrid, rng: random.Random = None):
+        super().__init__(grid, rng)
+        self._pick = BitStream(self.rng).pick
+        self._backtrack = []
+        self._dir = 0
+        self._backtracking = False
+        # The directions not yet tried from each branch that's been registered
+        self._branches = {(0, 0): grid.open_at(0, 0)}
+        self.steps = 0
+
+    @property
+    def backtracking(self) -> bool:
+        return self._backtracking
+
+    @property
+    def path(self):
+        return self._backtrack + [self._pos]
+
+    def step(self):
+        if self.is_done:
+            return
+        self._advance()
+        self.steps += 1
+
+    def _advance(self):
+        grid, branches, backtrack = self._grid, self._branches, self._backtrack
+        while True:
+            pos = self._pos
+            valid = grid.open_at(*pos)
+            branch = branches.get(pos)
+            # Register this branch if there are multiple directions to go in, except for the one
+            # we just came from.
+            if branch is None and valid & (valid - 1):
+                branch = valid
+                if backtrack:
+                    px, py = backtrack[-1]
+                    branch &= ~_WALLS[(px - pos[0], py - pos[1])]
+                branches[pos] = branch
+
+            if branch:
+                # Choose a direction to move if we're at a branch
+                self._backtracking = False
+                self._dir = self._pick(branch)
+                branches[pos] = branch & ~self._dir
+
+            if self._backtracking:
+                if backtrack:
+                    self._pos = backtrack.pop()
+                    return
+                self._backtracking = False
+            elif self._dir & valid:
+                backtrack.append(pos)
+                dx, dy = _OFFSETS[self._dir]
+                self._pos = (pos[0] + dx, pos[1] + dy)
+                return
+            else:
+                assert backtrack, "the solver is stuck with nowhere to backtrack to"
+                self._backtracking = True
+
+
+class Viewport:
+    """
+    A window onto part of a tiled grid, for displays. It draws only the cells in view and scrolls
+    to keep whatever it follows away from its edges, paging tiles in and out as it goes. It stands
+    in for a grid's `canvas` and `take_changes`.
+    """
+
+    def __init__(self, grid: TiledGrid, width: int, height: int):
+        self._grid = grid
+        self._width = min(width, grid.width)
+        self._height = min(height, grid.height)
+        self._origin = (0, 0)
+        self._canvas = None
+        self._changes = set()
+
+    @property
+    def grid(self) -> TiledGrid:
+        return self._grid
+
+    @property
+    def origin(self):
+        "The position of the top-left cell in view."
+        return self._origin
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    @property
+    def canvas_width(self) -> int:
+        return self._width * 4 + 1
+
+    @property
+    def canvas_height(self) -> int:
+        return self._height * 2 + 1
+
+    @property
+    def canvas(self):
+        "The drawn cells in view, as a list of rows of characters."
+        if self._canvas is None:
+            grid = self._grid
+            x, y = self._origin
+            # The cells just outside the view decide how its edges are drawn, wherever the view
+            # doesn't reach the edge of the grid
+            left, right = x > 0, x + self._width < grid.width
+            start, width = x - left, self._width + left + right
+            bottom = y + self._height
+            above = grid.row(y - 1, start, width) if y > 0 else None
+            below = grid.row(bottom, start, width) if bottom < grid.height else None
+            rows = (grid.row(y + i, start, width) for i in range(self._height))
+            lines = render_rows(self._width, rows, above, below, left, right)
+            self._canvas = [list(line) for line in lines]
+        return self._canvas
+
+    def take_changes(self):
+        "Gets and clears the set of (X, Y) canvas positions that have changed since the last call."
+        changes = self._changes
+        self._changes = set()
+        return changes
+
+    def to_canvas(self, pos):
+        "Gets the canvas position of the middle of a cell, or None if it's out of view."
+        x, y = pos[0] - self._origin[0], pos[1] - self._origin[1]
+        if 0 <= x < self._width and 0 <= y < self._height:
+            return x * 4 + 2, y * 2 + 1
+        return None
+
+    def follow(self, pos):
+        """
+        Scrolls so that a cell is centered, if it's within a quarter of the view from an edge.
+        Everything in view changes when it scrolls.
+        """
+        x, y = pos[0] - self._origin[0], pos[1] - self._origin[1]
+        margin_x, margin_y = self._width // 4, self._height // 4
+        if margin_x <= x < self._width - margin_x and margin_y <= y < self._height - margin_y:
+            return
+        ox = max(0, min(pos[0] - self._width // 2, self._grid.width - self._width))
+        oy = max(0, min(pos[1] - self._height // 2, self._grid.height - self._height))
+        if (ox, oy) == self._origin:
+            return
+        self._origin = (ox, oy)
+        self._canvas = None
+        canvas = self.canvas
+        self._changes = {(cx, cy) for cy in range(len(canvas)) for cx in range(len(canvas[cy]))}
@@ -0,0 +1,231 @@
+"""
+Solver traces. A trace records every move a solver made through a maze, two bits per move, so that
+a solve can be replayed later without running the solver again.
+
+Trace files start with a small header, followed by the maze itself and then the moves:
+
+    magic      4 bytes   b"MZTR"
+    version    u8        1
+    padding    3 bytes
+    moves      u64       the number of moves
+    maze       a complete maze file, as written by `mazegen.storage.save`
+    moves      2 bits per move, four per byte starting from the low bits: 0 for north, 1 for
+               east, 2 for south and 3 for west, the same order as `Wall`
+
+All integers are little-endian. Moves start from the entrance at (0, 0).
+"""
+import struct
+from .grid import *
+from .solver import MazeSolver, Solver
+from .storage import pack_codes, read_grid, write_grid
+
+__all__ = ("Trace", "TraceReplay", "record")
+
+MAGIC = b"MZTR"
+VERSION = 1
+HEADER = struct.Struct("<4sB3xQ")
+
+NORTH, EAST, SOUTH, WEST = range(4)
+# The (X, Y) offset of each move
+OFFSETS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+_MOVES = {offset: move for move, offset in enumerate(OFFSETS)}
+# Moves are kept one per byte until there are this many, then packed four to a byte
+_CHUNK = 1 << 16
+
+
+def _count_table(offset: int, minus: int, plus: int) -> bytes:
+    "Sums a move's offset over the four moves packed in each byte, plus `offset` per move."
+    table = []
+    for packed in range(256):
+        moves = [(packed >> (i * 2)) & 3 for i in range(4)]
+        table.append(sum(offset + (move == plus) - (move == minus) for move in moves))
+    return bytes(table)
+
+
+# The X and Y offsets of a whole byte of moves, shifted up by 1 per move to fit in a byte
+_DX = _count_table(1, WEST, EAST)
+_DY = _count_table(1, NORTH, SOUTH)
+
+
+class Trace:
+    """
+    The moves a solver made through a grid, packed two bits per move into a `bytearray`. Moves are
+    appended one at a time while recording and can be read back from anywhere.
+    """
+
+    def __init__(self, grid: Grid, data=b"", count: int = 0):
+        self._grid = grid
+        self._data = bytearray(data[: (count + 3) // 4])
+        # Moves not packed yet, one per byte. Only whole bytes of moves are ever packed.
+        self._pending = bytearray()
+        if count % 4:
+            last = self._data.pop()
+            self._pending.extend((last >> (i * 2)) & 3 for i in range(count % 4))
+
+    @classmethod
+    def load(cls, path):
+        "Loads a trace, and the maze it was recorded on, from a trace file."
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a trace file")
+        if version != VERSION:
+            raise ValueError("unsupported trace file version {}".format(version))
+        grid, size = read_grid(data[HEADER.size :])
+        moves = memoryview(data)[HEADER.size + size :]
+        if len(moves) < (count + 3) // 4:
+            raise ValueError("truncated trace file")
+        return cls(grid, moves, count)
+
+    def save(self, path):
+        "Writes this trace, along with its maze, to a trace file."
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self)))
+            write_grid(self._grid, f)
+            f.write(self.data)
+
+    @property
+    def grid(self) -> Grid:
+        return self._grid
+
+    @property
+    def data(self) -> bytes:
+        "The packed moves."
+        return bytes(self._data) + pack_codes(bytes(self._pending))
+
+    def __len__(self):
+        return len(self._data) * 4 + len(self._pending)
+
+    def append(self, move: int):
+        "Records a move: 0 for north, 1 for east, 2 for south or 3 for west."
+        pending = self._pending
+        pending.append(move)
+        if len(pending) >= _CHUNK:
+            self._data += pack_codes(bytes(pending))
+            pending.clear()
+
+    def move(self, index: int) -> int:
+        "Gets the move at the given index."
+        packed = len(self._data) * 4
+        if index >= packed:
+            return self._pending[index - packed]
+        return (self._data[index // 4] >> ((index % 4) * 2)) & 3
+
+    def moves(self, start: int = 0, stop: int = None):
+        "Yields the moves from `start` up to `stop`, or the end."
+        stop = len(self) if stop is None else min(stop, len(self))
+        move = self.move
+        for index in range(start, stop):
+            yield move(index)
+
+    def position(self, count: int):
+        """
+        Gets the position after the first `count` moves. Whole bytes of moves are summed with
+        lookup tables instead of being replayed, so seeking anywhere is cheap.
+        """
+        count = max(0, min(count, len(self)))
+        whole = min(count // 4, len(self._data))
+        head = self._data[:whole]
+        x = sum(head.translate(_DX)) - whole * 4
+        y = sum(head.translate(_DY)) - whole * 4
+        for move in self.moves(whole * 4, count):
+            dx, dy = OFFSETS[move]
+            x += dx
+            y += dy
+        return (x, y)
+
+
+def record(solver: MazeSolver) -> Trace:
+    """
+    Runs a solver until it's done, recording every move into a new trace. The solver has to move
+    to a neighboring cell on every step, like `Solver` does, since that's all a trace can hold.
+    `Solver` records its own moves as it makes them, so it runs at close to full speed.
+    """
+    if solver.pos != (0, 0):
+        raise ValueError("traces start from the entrance at (0, 0)")
+    trace = Trace(solver.grid)
+    if isinstance(solver, Solver):
+        solver.trace = trace
+        try:
+            solver.run_to_completion()
+        finally:
+            solver.trace = None
+        return trace
+
+    append = trace.append
+    x, y = solver.pos
+    while not solver.is_done:
+        solver.step()
+        nx, ny = solver.pos
+        move = _MOVES.get((nx - x, ny - y))
+        if move is None:
+            raise ValueError(
+                "{} doesn't move one cell at a time, so it can't be traced".format(
+                    type(solver).__name__
+                )
+            )
+        append(move)
+        x, y = nx, ny
+    return trace
+
+
+class TraceReplay(MazeSolver):
+    """
+    Plays a trace back as though it were a solver, so that it can be shown by any display. Every
+    step replays one move, and the replay can seek to any move or skip straight to the end.
+    """
+
+    def __init__(self, trace: Trace):
+        super().__init__(trace.grid)
+        self._trace = trace
+        self._moves = 0
+
+    @property
+    def trace(self) -> Trace:
+        return self._trace
+
+    @property
+    def moves(self) -> int:
+        "The number of moves replayed so far."
+        return self._moves
+
+    @property
+    def is_done(self) -> bool:
+        return self._moves >= len(self._trace)
+
+    @property
+    def path(self):
+        # Stepping back onto the previous cell is backtracking, so it drops the last cell instead.
+        path = [(0, 0)]
+        x, y = 0, 0
+        for move in self._trace.moves(0, self._moves):
+            dx, dy = OFFSETS[move]
+            x, y = x + dx, y + dy
+            if len(path) > 1 and path[-2] == (x, y):
+                path.pop()
+            else:
+                path.append((x, y))
+        return path
+
+    def step(self):
+        if self.is_done:
+            return
+        dx, dy = OFFSETS[self._trace.move(self._moves)]
+        x, y = self._pos
+        self._pos = (x + dx, y + dy)
+        self._moves += 1
+
+    def seek(self, count: int):
+        "Jumps to just after the first `count` moves, or the end if there aren't that many."
+        self._moves = max(0, min(count, len(self._trace)))
+        self._pos = self._trace.position(self._moves)
+
+    def skip(self):
+        "Jumps to the end of the trace."
+        self.seek(len(self._trace))
+
+    def run_to_completion(self) -> int:
+        remaining = len(self._trace) - self._moves
+        self.skip()
+        return remaining
@@ -0,0 +1,106 @@
+"""
+Maze generators that carve the whole grid at once using NumPy.
+
+These write straight into the grid's packed wall storage, so the result is an ordinary `Grid` that
+can be drawn and solved like any other.
+"""
+import abc
+import numpy as np
+from .grid import *
+from .maze import MazeGenerator, open_walls
+
+__all__ = ("BinaryTree", "Sidewinder")
+
+
+NORTH, EAST, SOUTH, WEST = (np.uint8(w.value) for w in Wall)
+
+
+def _rng(generator: MazeGenerator):
+    # Seed NumPy from the generator's own random number generator, so that seeds still apply.
+    return np.random.default_rng(generator.rng.getrandbits(64))
+
+
+def _walls(grid: Grid):
+    return np.frombuffer(grid.walls, dtype=np.uint8).reshape(grid.height, grid.width)
+
+
+def _carve_east(walls, carve):
+    "Removes the east walls of every cell where `carve` (shaped height x width-1) is set."
+    carve = carve.astype(np.uint8)
+    walls[:, :-1] &= ~(carve * EAST)
+    walls[:, 1:] &= ~(carve * WEST)
+
+
+def _carve_north(walls, carve):
+    "Removes the north walls of every cell where `carve` (shaped height-1 x width) is set."
+    carve = carve.astype(np.uint8)
+    walls[1:, :] &= ~(carve * NORTH)
+    walls[:-1, :] &= ~(carve * SOUTH)
+
+
+class _Vectorized(MazeGenerator):
+    "A base for generators that carve the whole grid at once, in `_fill()`."
+
+    def generate(self):
+        self._fill()
+        self.grid.invalidate()
+
+    def _carve(self):
+        self._fill()
+        yield from open_walls(self.grid)
+
+    @abc.abstractmethod
+    def _fill(self):
+        "Carves every wall of the maze at once."
+
+
+class BinaryTree(_Vectorized):
+    """
+    A binary tree maze generator. Every cell carves either north or east.
+    """
+
+    def _fill(self):
+        height, width = self.grid.height, self.grid.width
+        walls = _walls(self.grid)
+        rng = _rng(self)
+
+        north = rng.random((height, width)) < 0.5
+        # The top row can only go east, and the rightmost column can only go north.
+        north[0, :] = False
+        north[:, -1] = True
+        north[0, -1] = False
+        _carve_east(walls, ~north[:, :-1])
+        _carve_north(walls, north[1:, :])
+
+
+class Sidewinder(_Vectorized):
+    """
+    A Sidewinder maze generator. Each row is split into random runs of cells carved east, and each
+    run opens north through one randomly chosen cell.
+    """
+
+    def _fill(self):
+        height, width = self.grid.height, self.grid.width
+        walls = _walls(self.grid)
+        rng = _rng(self)
+
+        # The top row is one long corridor.
+        _carve_east(walls[:1], np.ones((1, width - 1), dtype=bool))
+        if height == 1:
+            return
+
+        # Decide where each run in the remaining rows ends. Runs never wrap across rows because
+        # the last column always closes its run.
+        close = rng.random((height - 1, width)) < 0.5
+        close[:, -1] = True
+        _carve_east(walls[1:], ~close[:, :-1])
+
+        # Pick one cell from each run to carve north from.
+        ends = np.flatnonzero(close)
+        starts = np.empty_like(ends)
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+        chosen = starts + (rng.random(len(ends)) * (ends - starts + 1)).astype(ends.dtype)
+        north = np.zeros((height - 1) * width, dtype=bool)
+        north[chosen] = True
+        _carve_north(walls, north.reshape(height - 1, width))